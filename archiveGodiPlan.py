@@ -1,14 +1,15 @@
 import datetime
 import os
 
-import dateparser
-
+from churchtools.metrics import dump_at_exit_from_environ
 from gottesdienstplan import GoogleSheet, Gottesdienstplan
+from gottesdienstplan.dates import parse_date
 
 SPREADSHEET_ID = os.environ["SPREADSHEET_ID"]
 
 
 if __name__ == "__main__":
+    dump_at_exit_from_environ("archiveGodiPlan")
     plan = Gottesdienstplan()
     archive = GoogleSheet(SPREADSHEET_ID, "Archiv")
     rows_to_delete = []
@@ -17,7 +18,7 @@ if __name__ == "__main__":
     yesterday = today - datetime.timedelta(days=1)
     for index, row in enumerate(plan.iter_rows(starting_row=starting_row)):
         try:
-            date = dateparser.parse(row[0], settings={"TIMEZONE": "CET"})
+            date = parse_date(row[0])
         except ValueError:
             print(f"Could not parse date value in row {starting_row+index}")
             raise
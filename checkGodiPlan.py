@@ -3,6 +3,7 @@ import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
+from churchtools.metrics import dump_at_exit_from_environ
 from gottesdienstplan import GoDiPlanChecker
 
 MAIL_TEXT_TEMPLATE = """
@@ -70,6 +71,7 @@ class Mailer:
 
 
 if __name__ == "__main__":
+    dump_at_exit_from_environ("checkGodiPlan")
     MAIL_DOMAIN = os.environ.get("MAIL_DOMAIN")
 
     p = GoDiPlanChecker(mail_domain=MAIL_DOMAIN)
@@ -3,6 +3,7 @@ import os
 import re
 import sys
 
+from churchtools.metrics import dump_at_exit_from_environ
 from nextcloud import NextCloud
 
 NEXTCLOUD_BASE_URL = os.environ["NEXTCLOUD_BASE_URL"]
@@ -37,6 +38,7 @@ def find_outdated_folders(nc, base_folder, weeks):
 
 
 if __name__ == "__main__":
+    dump_at_exit_from_environ("checkOldGoDiFolders")
     nc = NextCloud(
         webdav_url=f"{NEXTCLOUD_BASE_URL}/remote.php/dav/files/wulmer/",
         webdav_auth=(NEXTCLOUD_USER, NEXTCLOUD_TOKEN),
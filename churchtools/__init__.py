@@ -1,48 +1,251 @@
-try:
-    from functools import cache
-except ImportError:
-    from functools import lru_cache as cache
-from typing import Dict, Iterator, List, Set
+import datetime
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from . import entitycache, jsonstream
+from .autogroups import AutoGroups
+from .changeset import ChangeSet
+from .entitycache import EntityCache
+from .groupstore import GroupMemberStore
+from .httpcache import CachedSession, HttpCache
+from .masterdata import MasterData
+from .metrics import REGISTRY, normalize_endpoint
+from .models import Group, GroupMember, Person
+from .personstore import PersonStore, as_utc, modified_date
+from .ratelimit import AimdLimiter, RetryPolicy, ThrottledSession
+from .reconcile import IdSet
+from .singleflight import SingleFlight, request_key
+from .snapshot import ChurchToolsSnapshot
+
+__all__ = [
+    "AutoGroups",
+    "ChangeSet",
+    "ChurchToolsApi",
+    "ChurchToolsSnapshot",
+    "EntityCache",
+    "Group",
+    "GroupMember",
+    "GroupMemberStore",
+    "HttpCache",
+    "IdSet",
+    "MasterData",
+    "Person",
+    "PersonStore",
+    "RetryPolicy",
+]
 
 SYSTEMUSER_STATUSCODE = 7
 
+# maximum number of ids sent in a single `ids[]` filter
+IDS_CHUNK_SIZE = 100
+
+# connection pool of each per-thread session; a thread only sends one request
+# at a time, one spare connection covers a response which is still streamed
+POOL_CONNECTIONS = 1
+POOL_MAXSIZE = 2
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def chunked(ids: Iterable[int], size: int = None) -> Iterator[List[int]]:
+    if size is None:
+        size = IDS_CHUNK_SIZE
+    chunk = []
+    for id_ in ids:
+        chunk.append(id_)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _mark_worker_thread(local: threading.local):
+    local.is_worker = True
+
 
 class ChurchToolsApi:
-    def __init__(self, base_url, token):
+    """Client for the ChurchTools REST API.
+
+    Requests are sent one after another by default. With ``max_workers`` >
+    1, paginated listings and :meth:`map_concurrent` run on a bounded pool
+    of worker threads. Every thread uses its own ``requests.Session``, so
+    keep-alive connections are reused per thread without sharing a session
+    across threads.
+
+    Throttled (429) and failed requests are retried according to ``retry``.
+    All threads share an AIMD limiter which halves the number of requests
+    in flight whenever the server throttles and slowly raises it again up
+    to ``max_workers``.
+
+    Persons, groups, memberships and tags fetched by id are kept in an
+    in-process ``entity_cache``; writes through this client update or drop
+    the affected entries."""
+
+    def __init__(
+        self,
+        base_url,
+        token,
+        page_limit: int = None,
+        max_workers: int = 1,
+        cache: HttpCache = None,
+        retry: RetryPolicy = None,
+        entity_cache: EntityCache = None,
+        stream_pages: bool = False,
+    ):
         self._base_url = base_url
         self._token = token
-        self._session = requests.Session()
-        self._session.headers.update({"Authorization": f"Login {token}"})
+        self._page_limit = page_limit
+        self._stream_pages = stream_pages
+        self._max_workers = max_workers
+        self._cache = cache
+        self._retry = retry if retry is not None else RetryPolicy()
+        self._limiter = AimdLimiter(max_limit=max(1, max_workers))
+        self._local = threading.local()
+        # sessions of all threads, closed by close()
+        self._sessions: List[requests.Session] = []
+        self._sessions_lock = threading.Lock()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._single_flight = SingleFlight()
+        self.entity_cache = entity_cache if entity_cache is not None else EntityCache()
         self.non_protected_group_ids = set()
+        # set once the server answered a `modified_after` request with
+        # unmodified persons
+        self.modified_after_ignored = False
+        self._masterdata = None
 
-    @cache
-    def get_id_of_group_type(self, group_type: str) -> int:
-        response = self._session.get(self._base_url + "/person/masterdata")
-        response.raise_for_status()
-        group_types = response.json()["data"]["groupTypes"]
-        filtered_group_types = list(
-            filter(lambda g: g["name"] == group_type, group_types)
-        )
-        if len(filtered_group_types) == 0:
-            raise ValueError(f"No group type found for '{group_type}'!")
-        return int(filtered_group_types[0]["id"])
+    def __enter__(self):
+        return self
 
-    @cache
-    def get_id_of_group_role(self, group_type_id: int, group_role: str) -> int:
-        response = self._session.get(self._base_url + "/person/masterdata")
-        response.raise_for_status()
-        roles = response.json()["data"]["roles"]
-        filtered_roles = list(
-            filter(
-                lambda r: r["groupTypeId"] == group_type_id and r["name"] == group_role,
-                roles,
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def close(self):
+        """Stop the worker threads and close the sessions of all threads."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+            # threads which still use the client start with a new session
+            self._local = threading.local()
+        for session in sessions:
+            session.close()
+
+    @property
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = self._make_session()
+        return session
+
+    def _make_session(self) -> requests.Session:
+        if self._cache is not None:
+            session = CachedSession(
+                self._cache, self._base_url, limiter=self._limiter, retry=self._retry
             )
+        else:
+            session = ThrottledSession(limiter=self._limiter, retry=self._retry)
+        adapter = HTTPAdapter(
+            pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE
         )
-        if len(filtered_roles) == 0:
-            raise ValueError(f"No group role found for group ID '{group_type_id}'!")
-        return int(filtered_roles[0]["id"])
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"Authorization": f"Login {self._token}"})
+        session.hooks["response"].append(self._record_metrics)
+        with self._sessions_lock:
+            self._sessions.append(session)
+        return session
+
+    def _runs_concurrently(self) -> bool:
+        # tasks running on a worker thread must not wait for further tasks
+        # of the same bounded pool, that could dead-lock
+        return self._max_workers > 1 and not getattr(self._local, "is_worker", False)
+
+    def _submit(self, fn: Callable[..., R], *args) -> "Future[R]":
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers,
+                    thread_name_prefix="churchtools",
+                    initializer=_mark_worker_thread,
+                    initargs=(self._local,),
+                )
+            return self._executor.submit(fn, *args)
+
+    def map_concurrent(self, fn: Callable[[T], R], items: Iterable[T]) -> List[R]:
+        """Return ``[fn(item) for item in items]``, computed by the worker threads.
+
+        Meant for fan-out over persons or groups, e.g.
+        ``api.map_concurrent(api.get_person, person_ids)``. Called from a
+        worker thread, or with ``max_workers=1``, the items are processed one
+        after another."""
+        items = list(items)
+        if not self._runs_concurrently() or len(items) <= 1:
+            return [fn(item) for item in items]
+        futures = [self._submit(fn, item) for item in items]
+        try:
+            return [f.result() for f in futures]
+        finally:
+            for f in futures:
+                f.cancel()
+
+    def _record_metrics(self, response: requests.Response, *args, **kwargs):
+        path = response.url.split("?")[0]
+        if path.startswith(self._base_url):
+            path = path[len(self._base_url) :]
+        if kwargs.get("stream"):
+            size = int(response.headers.get("Content-Length", 0))
+        else:
+            size = len(response.content)
+        REGISTRY.observe(
+            "churchtools",
+            response.request.method,
+            normalize_endpoint(path),
+            response.status_code,
+            response.elapsed.total_seconds(),
+            size,
+        )
+
+    def _invalidate(self, *paths: str):
+        """Drop cached responses below the given (glob) paths."""
+        if isinstance(self._session, CachedSession):
+            self._session.cache.invalidate(*paths)
+
+    @property
+    def masterdata(self) -> MasterData:
+        """Master data of this client, downloaded once on first use."""
+        if self._masterdata is None:
+            self._masterdata = MasterData(self)
+        return self._masterdata
+
+    def get_masterdata(self) -> Dict:
+        return self._get_json(self._base_url + "/person/masterdata")["data"]
+
+    def get_id_of_group_type(self, group_type: str) -> int:
+        return self.masterdata.get_id_of_group_type(group_type)
+
+    def get_id_of_group_role(self, group_type_id: int, group_role: str) -> int:
+        return self.masterdata.get_id_of_group_role(group_type_id, group_role)
 
     def create_group(self, group_name: str, group_type: str) -> Dict:
         group_type_id = self.get_id_of_group_type(group_type=group_type)
@@ -56,23 +259,39 @@ class ChurchToolsApi:
         }
         response = self._session.post(self._base_url + "/groups", json=data)
         response.raise_for_status()
+        self._invalidate("/groups")
         return response.json()["data"]
 
     def delete_group(self, group_id: int):
         assert group_id in self.non_protected_group_ids
         response = self._session.delete(self._base_url + f"/groups/{group_id}")
         response.raise_for_status()
+        self._invalidate("/groups*", "/persons/*/groups")
+        self.entity_cache.invalidate(entitycache.GROUP, group_id)
+        self.entity_cache.invalidate(entitycache.MEMBERSHIPS)
         self.non_protected_group_ids.remove(group_id)
 
     def add_to_group(self, who: int, to: int):
         response = self._session.put(self._base_url + f"/groups/{to}/members/{who}")
         response.raise_for_status()
+        self._invalidate_membership(who, to)
 
     def remove_from_group(self, who: int, from_: int):
         response = self._session.delete(
             self._base_url + f"/groups/{from_}/members/{who}"
         )
         response.raise_for_status()
+        self._invalidate_membership(who, from_)
+
+    def _invalidate_membership(self, person_id: int, group_id: int):
+        self.entity_cache.invalidate(entitycache.GROUP, group_id)
+        self.entity_cache.invalidate(entitycache.MEMBERSHIPS, person_id)
+        self._invalidate(
+            f"/groups/{group_id}",
+            f"/groups/{group_id}/*",
+            "/groups/members",
+            f"/persons/{person_id}/groups",
+        )
 
     def get_login_token(self, person_id: int) -> str:
         response = self._session.get(
@@ -82,14 +301,20 @@ class ChurchToolsApi:
         return response.json()["data"]
 
     def get_person(self, person_id: int):
-        response = self._session.get(self._base_url + f"/persons/{person_id}")
-        response.raise_for_status()
-        return response.json()["data"]
+        return self.entity_cache.get_or_load(
+            entitycache.PERSON,
+            int(person_id),
+            lambda: self._get_json(self._base_url + f"/persons/{person_id}")["data"],
+        )
 
     def get_memberships(self, person_id: int) -> List[Dict]:
-        response = self._session.get(self._base_url + f"/persons/{person_id}/groups")
-        response.raise_for_status()
-        return response.json()["data"]
+        return self.entity_cache.get_or_load(
+            entitycache.MEMBERSHIPS,
+            int(person_id),
+            lambda: self._get_json(self._base_url + f"/persons/{person_id}/groups")[
+                "data"
+            ],
+        )
 
     def get_system_person_by_name(self, name: str) -> Dict:
         for user in self.get_persons(status_ids=[SYSTEMUSER_STATUSCODE]):
@@ -98,27 +323,148 @@ class ChurchToolsApi:
         raise KeyError(f"System user with name '{name}' not found.")
 
     def get_default_email_for_person(self, person_id: int) -> str:
-        person = self.get_person(person_id)
-        emails = person.get("emails", [])
-        for email in emails:
+        email = self._get_default_email(self.get_person(person_id))
+        if email is None:
+            raise ValueError(f"Person #{person_id} has no default email address!")
+        return email
+
+    @staticmethod
+    def _get_default_email(person: Dict) -> Optional[str]:
+        for email in person.get("emails", []):
             if email["isDefault"]:
                 return email["email"]
-        raise ValueError(f"Person #{person_id} has no default email address!")
+        return None
+
+    def get_persons_by_ids(self, person_ids: Iterable[int]) -> Dict[int, Dict]:
+        """Fetch many persons with a few `ids[]` requests, keyed by id.
+
+        Persons which do not exist or are not visible are missing in the
+        result."""
+        persons = {}
+        missing = set()
+        for person_id in set(person_ids):
+            person = self.entity_cache.get(entitycache.PERSON, person_id)
+            if person is not None:
+                persons[person_id] = person
+            else:
+                missing.add(person_id)
+        for chunk in chunked(sorted(missing)):
+            for person in self.paginate(
+                self._base_url + "/persons", params={"ids[]": chunk}
+            ):
+                persons[person["id"]] = person
+                self.entity_cache.put(entitycache.PERSON, person["id"], person)
+        return persons
+
+    def get_default_emails(self, person_ids: Iterable[int]) -> Dict[int, str]:
+        """Return the default email of each person which has one."""
+        emails = {}
+        for person_id, person in self.get_persons_by_ids(person_ids).items():
+            email = self._get_default_email(person)
+            if email is not None:
+                emails[person_id] = email
+        return emails
 
     def get_tags_for_person(self, person_id: int) -> Set[str]:
-        response = self._session.get(self._base_url + f"/persons/{person_id}/tags")
-        response.raise_for_status()
-        tags = {d["name"] for d in response.json()["data"]}
+        def load():
+            response = self._get_json(self._base_url + f"/persons/{person_id}/tags")
+            return frozenset(d["name"] for d in response["data"])
+
+        return set(
+            self.entity_cache.get_or_load(entitycache.TAGS, int(person_id), load)
+        )
+
+    def get_tags(self) -> List[Dict]:
+        """Return all person tags."""
+        response = self._get_json(self._base_url + "/tags", params={"type": "persons"})
+        return response["data"]
+
+    def get_persons_with_tag(self, tag_id: int) -> Iterator[Dict]:
+        yield from self.paginate(self._base_url + f"/tags/{tag_id}/persons")
+
+    def get_person_ids_with_tags(
+        self, names: Iterable[str] = None
+    ) -> Dict[str, List[int]]:
+        """Return the ids of the persons with each tag, keyed by tag name.
+
+        Only the tags in ``names`` are listed if given, with one paginated
+        request per tag."""
+        tags = self.get_tags()
+        if names is not None:
+            names = set(names)
+            tags = [tag for tag in tags if tag["name"] in names]
+
+        def list_persons(tag: Dict) -> List[int]:
+            return [p["id"] for p in self.get_persons_with_tag(tag["id"])]
+
+        tagged: Dict[str, List[int]] = {}
+        for tag, person_ids in zip(tags, self.map_concurrent(list_persons, tags)):
+            tagged.setdefault(tag["name"], []).extend(person_ids)
+        return tagged
+
+    def get_tags_for_persons(
+        self, person_ids: Iterable[int], names: Iterable[str] = None
+    ) -> Dict[int, Set[str]]:
+        """Return the tag names of many persons, keyed by person id.
+
+        The map is built from the person listing of every tag, or only of the
+        tags in ``names`` if given, so it costs about one request per tag,
+        not per person. If the server does not offer these listings, the
+        tags are fetched per person."""
+        person_ids = sorted(set(person_ids))
+        if names is not None:
+            names = set(names)
+        try:
+            tagged = self.get_person_ids_with_tags(names)
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code != 404:
+                raise
+            person_tags = self.map_concurrent(self.get_tags_for_person, person_ids)
+            if names is not None:
+                person_tags = [tags & names for tags in person_tags]
+            return dict(zip(person_ids, person_tags))
+        tags: Dict[int, Set[str]] = {person_id: set() for person_id in person_ids}
+        for name, tagged_ids in tagged.items():
+            for person_id in tagged_ids:
+                if person_id in tags:
+                    tags[person_id].add(name)
         return tags
 
-    def get_persons(self, status_ids: List[str] = None) -> Iterator[Dict]:
+    def get_persons(
+        self,
+        status_ids: List[str] = None,
+        modified_after: datetime.datetime = None,
+        as_model: bool = False,
+        keep_raw: bool = False,
+    ) -> Iterator[Union[Dict, Person]]:
+        """Yield persons as dicts, or as compact :class:`Person` models.
+
+        With ``keep_raw`` the models keep the complete payload, too.
+        ``modified_after`` is taken as UTC if it is naive. Persons without a
+        modification date count as modified."""
         params = {}
         if status_ids is not None:
             params["status_ids[]"] = status_ids
+        if modified_after is not None:
+            modified_after = as_utc(modified_after)
+            params["modified_after"] = modified_after.isoformat()
         for person in self.paginate(self._base_url + "/persons", params=params):
-            yield person
+            if modified_after is not None:
+                modified = modified_date(person)
+                if modified is not None and modified < modified_after:
+                    # the server ignores the filter, apply it here
+                    self.modified_after_ignored = True
+                    continue
+            yield Person.from_json(person, keep_raw) if as_model else person
 
     def get_group(self, name: str = None, id: int = None) -> Dict:
+        if id is not None:
+            return self.entity_cache.get_or_load(
+                entitycache.GROUP, int(id), lambda: self._get_group(id=id)
+            )
+        return self._get_group(name=name)
+
+    def _get_group(self, name: str = None, id: int = None) -> Dict:
         multiple_results = False
         if id is not None:
             response = self._session.get(self._base_url + f"/groups/{id}")
@@ -141,71 +487,181 @@ class ChurchToolsApi:
             raise ValueError(response) from e
 
     def get_groups(
-        self, query: str = None, group_type_ids: List[int] = None
-    ) -> Iterator[Dict]:
-        params = {"show_inactive_groups": False}
+        self,
+        query: str = None,
+        group_type_ids: List[int] = None,
+        as_model: bool = False,
+        keep_raw: bool = False,
+        include_inactive: bool = False,
+    ) -> Iterator[Union[Dict, Group]]:
+        params = {"show_inactive_groups": include_inactive}
         if query is not None:
             params["query"] = query
         if group_type_ids is not None:
             params["group_type_ids[]"] = group_type_ids
         for group in self.paginate(self._base_url + "/groups", params=params):
-            yield group
+            yield Group.from_json(group, keep_raw) if as_model else group
 
     def get_group_members(
-        self, group_id: int, role_ids: List[int] = None
-    ) -> Iterator[Dict]:
+        self,
+        group_id: int,
+        role_ids: List[int] = None,
+        as_model: bool = False,
+        keep_raw: bool = False,
+    ) -> Iterator[Union[Dict, GroupMember]]:
         params = {}
         if role_ids is not None:
             params["role_ids[]"] = role_ids
         for member in self.paginate(
             self._base_url + f"/groups/{group_id}/members", params=params
         ):
-            yield member
+            if as_model:
+                yield GroupMember.from_json(member, group_id, keep_raw)
+            else:
+                yield member
+
+    def get_members_of_groups(
+        self, group_ids: Iterable[int], role_ids: List[int] = None
+    ) -> Dict[int, List[Tuple[int, int]]]:
+        """Fetch the members of many groups at once.
+
+        Uses the multi-group endpoint `/groups/members` in chunks and returns
+        a reverse index: person id -> list of (group id, role id)."""
+        params = {}
+        if role_ids is not None:
+            params["role_ids[]"] = role_ids
+            role_ids = set(role_ids)
+        memberships = {}
+        for chunk in chunked(sorted(set(group_ids))):
+            for member in self.paginate(
+                self._base_url + "/groups/members",
+                params={**params, "group_ids[]": chunk},
+            ):
+                role_id = member["groupTypeRoleId"]
+                if role_ids is not None and role_id not in role_ids:
+                    continue
+                memberships.setdefault(member["personId"], []).append(
+                    (member["groupId"], role_id)
+                )
+        return memberships
 
     def get_global_permissions(self) -> dict:
-        response = self._session.get(self._base_url + "/permissions/global")
-        response.raise_for_status()
-        return response.json()["data"]
+        return self._get_json(self._base_url + "/permissions/global")["data"]
 
     def get_person_permissions(self, other_person_id: int) -> dict:
-        response = self._session.get(
+        return self._get_json(
             self._base_url + f"/permissions/internal/persons/{other_person_id}"
-        )
-        response.raise_for_status()
-        return response.json()["data"]
+        )["data"]
 
     def set_person_status(self, person_id, status_id) -> dict:
+        # setting the same status again does no harm
         response = self._session.patch(
-            self._base_url + f"/persons/{person_id}", json={"statusId": status_id}
+            self._base_url + f"/persons/{person_id}",
+            json={"statusId": status_id},
+            idempotent=True,
         )
         response.raise_for_status()
-        return response.json()["data"]
+        self._invalidate("/persons", f"/persons/{person_id}")
+        person = response.json()["data"]
+        self.entity_cache.put(entitycache.PERSON, int(person_id), person)
+        return person
 
     def get_status_ids(self) -> Dict[str, int]:
-        status_ids = {}
-        for status in self.get_statuses():
-            status_ids[status["name"]] = status["id"]
-        return status_ids
+        return dict(self.masterdata.status_ids)
 
     def get_statuses(self) -> Iterator[Dict]:
         for status in self.paginate(self._base_url + "/statuses"):
             yield status
 
-    def paginate(self, url: str, params: Dict[str, str] = None):
-        if params is None:
-            params = {}
-        last_page = 999
-        current_page = 1
-        while current_page <= last_page:
-            params.update({"page": current_page})
+    def paginate(
+        self,
+        url: str,
+        params: Dict[str, str] = None,
+        limit: int = None,
+        stream: bool = None,
+    ):
+        """Yield all items of a paginated endpoint, in page order.
+
+        The first page is fetched on its own to learn ``lastPage``; the
+        remaining pages are then fetched concurrently by the worker threads.
+        ``limit`` sets the page size and defaults to the ``page_limit`` given
+        to the constructor.
+
+        With ``stream`` (default: ``stream_pages`` of the constructor) the
+        pages are fetched one after another and their items are decoded and
+        yielded while the response is still read, so only one item at a time
+        is held in memory. Meant for large page sizes.
+        """
+        params = dict(params or {})
+        if limit is None:
+            limit = self._page_limit
+        if limit is not None:
+            params["limit"] = limit
+        if stream is None:
+            stream = self._stream_pages
+        if stream:
+            yield from self._paginate_streamed(url, params)
+            return
+
+        paged_data = self._get_page(url, params, 1)
+        yield from paged_data["data"]
+        pagination = paged_data["meta"].get("pagination")
+        if pagination is None:
+            return
+        pages = range(pagination["current"] + 1, pagination["lastPage"] + 1)
+        if not self._runs_concurrently():
+            for page in pages:
+                yield from self._get_page(url, params, page)["data"]
+            return
+
+        pending = deque()
+        page_iter = iter(pages)
+        try:
+            # keep at most twice the number of workers in flight so that a
+            # slow consumer does not buffer all pages in memory
+            for page in page_iter:
+                pending.append(self._submit(self._get_page, url, params, page))
+                if len(pending) >= 2 * self._max_workers:
+                    break
+            while pending:
+                yield from pending.popleft().result()["data"]
+                for page in page_iter:
+                    pending.append(self._submit(self._get_page, url, params, page))
+                    break
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _paginate_streamed(self, url: str, params: Dict[str, str]):
+        page = last_page = 1
+        while page <= last_page:
+            rest = {}
+            yield from self._stream_page(url, {**params, "page": page}, rest)
+            pagination = rest.get("meta", {}).get("pagination")
+            if pagination is None:
+                return
+            last_page = pagination["lastPage"]
+            page += 1
+
+    def _stream_page(self, url: str, params: Dict[str, str], rest: Dict):
+        with self._session.get(url, params=params, stream=True) as response:
+            response.raise_for_status()
+            yield from jsonstream.iter_items(
+                response.iter_content(jsonstream.CHUNK_SIZE), "data", rest
+            )
+
+    def _get_page(self, url: str, params: Dict[str, str], page: int) -> Dict:
+        return self._get_json(url, params={**params, "page": page})
+
+    def _get_json(self, url: str, params: Dict = None) -> Dict:
+        """GET a JSON document; identical concurrent requests share one call.
+
+        The returned document may be shared with other threads and must not
+        be modified."""
+
+        def fetch():
             response = self._session.get(url, params=params)
             response.raise_for_status()
-            paged_data = response.json()
-            for data in paged_data["data"]:
-                yield data
-            meta = paged_data["meta"]
-            if "pagination" in meta:
-                current_page = meta["pagination"]["current"] + 1
-                last_page = meta["pagination"]["lastPage"]
-            else:
-                break
+            return jsonstream.loads(response.content)
+
+        return self._single_flight.do(request_key(url, params), fetch)
@@ -0,0 +1,177 @@
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Dict, List, Set
+from urllib.parse import urlsplit
+
+import httpx
+
+from . import jsonstream
+from .singleflight import AsyncSingleFlight, request_key
+
+
+class AsyncChurchToolsApi:
+    """Asyncio variant of :class:`churchtools.ChurchToolsApi`.
+
+    All requests share one connection pool. ``max_per_host`` bounds the
+    number of requests in flight per host, so fan-out loops can simply
+    ``asyncio.gather`` hundreds of calls without overloading the server.
+
+    Use it as an async context manager, or call :meth:`aclose` when done::
+
+        async with AsyncChurchToolsApi(url, token) as api:
+            async for person in api.get_persons():
+                ...
+    """
+
+    def __init__(
+        self,
+        base_url,
+        token,
+        page_limit: int = None,
+        max_connections: int = 20,
+        max_per_host: int = 10,
+        transport: httpx.AsyncBaseTransport = None,
+    ):
+        self._base_url = base_url
+        self._token = token
+        self._page_limit = page_limit
+        self._max_per_host = max_per_host
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._single_flight = AsyncSingleFlight()
+        self._client = httpx.AsyncClient(
+            headers={"Authorization": f"Login {token}"},
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=httpx.Timeout(30.0),
+            transport=transport,
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, type, value, traceback):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self._max_per_host)
+        async with self._host_limits[host]:
+            response = await self._client.request(method, url, **kwargs)
+        response.raise_for_status()
+        return response
+
+    async def _get_json(self, url: str, params: Dict = None) -> Dict:
+        """GET a JSON document; identical concurrent requests share one call.
+
+        The returned document may be shared with other tasks and must not be
+        modified."""
+
+        async def fetch():
+            response = await self._request("GET", url, params=params)
+            return jsonstream.loads(response.content)
+
+        return await self._single_flight.do(request_key(url, params), fetch)
+
+    async def add_to_group(self, who: int, to: int):
+        await self._request("PUT", self._base_url + f"/groups/{to}/members/{who}")
+
+    async def remove_from_group(self, who: int, from_: int):
+        await self._request("DELETE", self._base_url + f"/groups/{from_}/members/{who}")
+
+    async def get_person(self, person_id: int):
+        response = await self._get_json(self._base_url + f"/persons/{person_id}")
+        return response["data"]
+
+    async def get_tags_for_person(self, person_id: int) -> Set[str]:
+        response = await self._get_json(self._base_url + f"/persons/{person_id}/tags")
+        return {d["name"] for d in response["data"]}
+
+    async def get_persons(self, status_ids: List[str] = None) -> AsyncIterator[Dict]:
+        params = {}
+        if status_ids is not None:
+            params["status_ids[]"] = status_ids
+        async for person in self.paginate(self._base_url + "/persons", params=params):
+            yield person
+
+    async def get_groups(
+        self, query: str = None, group_type_ids: List[int] = None
+    ) -> AsyncIterator[Dict]:
+        params = {"show_inactive_groups": False}
+        if query is not None:
+            params["query"] = query
+        if group_type_ids is not None:
+            params["group_type_ids[]"] = group_type_ids
+        async for group in self.paginate(self._base_url + "/groups", params=params):
+            yield group
+
+    async def get_group_members(
+        self, group_id: int, role_ids: List[int] = None
+    ) -> AsyncIterator[Dict]:
+        params = {}
+        if role_ids is not None:
+            params["role_ids[]"] = role_ids
+        async for member in self.paginate(
+            self._base_url + f"/groups/{group_id}/members", params=params
+        ):
+            yield member
+
+    async def set_person_status(self, person_id, status_id) -> dict:
+        response = await self._request(
+            "PATCH",
+            self._base_url + f"/persons/{person_id}",
+            json={"statusId": status_id},
+        )
+        return response.json()["data"]
+
+    async def get_statuses(self) -> AsyncIterator[Dict]:
+        async for status in self.paginate(self._base_url + "/statuses"):
+            yield status
+
+    async def paginate(
+        self, url: str, params: Dict[str, str] = None, limit: int = None
+    ) -> AsyncIterator[Dict]:
+        """Yield all items of a paginated endpoint, in page order.
+
+        Works like :meth:`churchtools.ChurchToolsApi.paginate`: after the first
+        page the remaining pages are requested concurrently."""
+        params = dict(params or {})
+        if limit is None:
+            limit = self._page_limit
+        if limit is not None:
+            params["limit"] = limit
+
+        paged_data = await self._get_page(url, params, 1)
+        for data in paged_data["data"]:
+            yield data
+        pagination = paged_data["meta"].get("pagination")
+        if pagination is None:
+            return
+        page_iter = iter(range(pagination["current"] + 1, pagination["lastPage"] + 1))
+
+        pending = deque()
+        try:
+            for page in page_iter:
+                pending.append(asyncio.ensure_future(self._get_page(url, params, page)))
+                if len(pending) >= 2 * self._max_per_host:
+                    break
+            while pending:
+                paged_data = await pending.popleft()
+                for page in page_iter:
+                    pending.append(
+                        asyncio.ensure_future(self._get_page(url, params, page))
+                    )
+                    break
+                for data in paged_data["data"]:
+                    yield data
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _get_page(self, url: str, params: Dict[str, str], page: int) -> Dict:
+        return await self._get_json(url, params={**params, "page": page})
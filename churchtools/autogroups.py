@@ -0,0 +1,324 @@
+import operator
+from collections import defaultdict
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Set,
+)
+
+import requests
+
+from .changeset import ChangeSet
+from .groupstore import GroupMemberStore
+from .masterdata import MasterData
+from .models import Group, Person
+from .reconcile import IdSet, group_changes, reconcile
+
+if TYPE_CHECKING:
+    from . import ChurchToolsApi
+
+
+class Rule:
+    """A set of persons; rules are combined with ``|``, ``&`` and ``-``."""
+
+    def __or__(self, other: "Rule") -> "Rule":
+        return _Combined(operator.or_, "|", self, other)
+
+    def __and__(self, other: "Rule") -> "Rule":
+        return _Combined(operator.and_, "&", self, other)
+
+    def __sub__(self, other: "Rule") -> "Rule":
+        return _Combined(operator.sub, "-", self, other)
+
+    def evaluate(self, index: "PersonIndex") -> IdSet:
+        raise NotImplementedError
+
+    def leaves(self) -> Iterator["Rule"]:
+        yield self
+
+
+class _Combined(Rule):
+    def __init__(
+        self, op: Callable[[IdSet, IdSet], IdSet], symbol: str, left: Rule, right: Rule
+    ):
+        self._op = op
+        self._symbol = symbol
+        self._left = left
+        self._right = right
+
+    def evaluate(self, index: "PersonIndex") -> IdSet:
+        return self._op(self._left.evaluate(index), self._right.evaluate(index))
+
+    def leaves(self) -> Iterator[Rule]:
+        yield from self._left.leaves()
+        yield from self._right.leaves()
+
+    def __repr__(self):
+        return f"({self._left!r} {self._symbol} {self._right!r})"
+
+
+class Status(Rule):
+    """Persons with one of the given statuses."""
+
+    def __init__(self, *names: str):
+        self.names = names
+
+    def status_ids(self, masterdata: MasterData) -> List[int]:
+        return [masterdata.status_ids[name] for name in self.names]
+
+    def evaluate(self, index: "PersonIndex") -> IdSet:
+        return index.persons_with_status(self.status_ids(index.masterdata))
+
+    def __repr__(self):
+        return f"Status{self.names!r}"
+
+
+class MemberStatus(Rule):
+    """Persons with any status marked as member status."""
+
+    def status_ids(self, masterdata: MasterData) -> List[int]:
+        return list(masterdata.member_status_ids)
+
+    def evaluate(self, index: "PersonIndex") -> IdSet:
+        return index.persons_with_status(self.status_ids(index.masterdata))
+
+    def __repr__(self):
+        return "MemberStatus()"
+
+
+class Role(Rule):
+    """Persons with one of the given roles in a group of the given type.
+
+    Without roles, all members of groups of the type."""
+
+    def __init__(self, group_type: str, *roles: str):
+        self.group_type = group_type
+        self.roles = roles
+
+    def role_ids(self, masterdata: MasterData) -> Optional[List[int]]:
+        if not self.roles:
+            return None
+        group_type_id = masterdata.get_id_of_group_type(self.group_type)
+        return [
+            masterdata.get_id_of_group_role(group_type_id, role) for role in self.roles
+        ]
+
+    def evaluate(self, index: "PersonIndex") -> IdSet:
+        role_ids = self.role_ids(index.masterdata)
+        if role_ids is None:
+            group_type_id = index.masterdata.get_id_of_group_type(self.group_type)
+            return index.by_group_type.get(group_type_id, IdSet())
+        return index.persons_with_role(role_ids)
+
+    def __repr__(self):
+        return f"Role{(self.group_type, *self.roles)!r}"
+
+
+class Tag(Rule):
+    """Persons tagged with one of the given tags.
+
+    The persons of each tag are listed with one request per tag; servers
+    without these listings cost one request per person."""
+
+    def __init__(self, *names: str):
+        self.names = names
+
+    def evaluate(self, index: "PersonIndex") -> IdSet:
+        return _union(index.by_tag.get(name, IdSet()) for name in self.names)
+
+    def __repr__(self):
+        return f"Tag{self.names!r}"
+
+
+def _load_tags(api: "ChurchToolsApi", names: Set[str]) -> Dict[str, List[int]]:
+    try:
+        return api.get_person_ids_with_tags(names)
+    except requests.HTTPError as e:
+        if e.response is None or e.response.status_code != 404:
+            raise
+    # no tag listings on this server, fetch the tags of every person
+    tagged: Dict[str, List[int]] = defaultdict(list)
+    person_ids = [p["id"] for p in api.get_persons()]
+    for person_id, tags in zip(
+        person_ids, api.map_concurrent(api.get_tags_for_person, person_ids)
+    ):
+        for name in tags & names:
+            tagged[name].append(person_id)
+    return tagged
+
+
+def _union(id_sets: Iterable[IdSet]) -> IdSet:
+    result = IdSet()
+    for id_set in id_sets:
+        result = result | id_set
+    return result
+
+
+def roles(group_roles: Mapping[str, Iterable[str]]) -> Rule:
+    """Rule for a mapping of group type -> roles, e.g. ``{"Dienst": {"Leiter"}}``."""
+    rules = [
+        Role(group_type, *sorted(names)) for group_type, names in group_roles.items()
+    ]
+    rule = rules[0]
+    for other in rules[1:]:
+        rule = rule | other
+    return rule
+
+
+class PersonIndex:
+    """Everything the rules are evaluated on, loaded at once.
+
+    Only what the given rules need is downloaded: the persons with the
+    statuses used by status rules, the persons with the tags used by tag
+    rules, and the members of the groups of all group types used by role
+    rules, with one bulk request filtered by the union of roles. With a
+    ``member_store`` only the members of changed groups are downloaded."""
+
+    def __init__(
+        self,
+        masterdata: MasterData,
+        by_status: Dict[int, IdSet] = None,
+        by_role: Dict[int, IdSet] = None,
+        by_group_type: Dict[int, IdSet] = None,
+        by_tag: Dict[str, IdSet] = None,
+    ):
+        self.masterdata = masterdata
+        self.by_status = by_status or {}
+        self.by_role = by_role or {}
+        self.by_group_type = by_group_type or {}
+        self.by_tag = by_tag or {}
+
+    def persons_with_status(self, status_ids: Iterable[int]) -> IdSet:
+        return _union(self.by_status.get(s, IdSet()) for s in status_ids)
+
+    def persons_with_role(self, role_ids: Iterable[int]) -> IdSet:
+        return _union(self.by_role.get(r, IdSet()) for r in role_ids)
+
+    @classmethod
+    def load(
+        cls,
+        api: "ChurchToolsApi",
+        rules: Iterable[Rule],
+        groups: List[Group] = None,
+        persons: Iterable[Person] = None,
+        member_store: GroupMemberStore = None,
+    ) -> "PersonIndex":
+        masterdata = api.masterdata
+        leaves = [leaf for rule in rules for leaf in rule.leaves()]
+        role_rules = [leaf for leaf in leaves if isinstance(leaf, Role)]
+        status_ids = {
+            status_id
+            for leaf in leaves
+            if isinstance(leaf, (Status, MemberStatus))
+            for status_id in leaf.status_ids(masterdata)
+        }
+        tag_names = {
+            name for leaf in leaves if isinstance(leaf, Tag) for name in leaf.names
+        }
+        index = cls(masterdata)
+
+        if status_ids:
+            if persons is None:
+                persons = api.get_persons(status_ids=sorted(status_ids), as_model=True)
+            by_status: Dict[int, List[int]] = defaultdict(list)
+            for person in persons:
+                by_status[person.status_id].append(person.id)
+            index.by_status = {s: IdSet(ids) for s, ids in by_status.items()}
+
+        if tag_names:
+            index.by_tag = {
+                name: IdSet(ids) for name, ids in _load_tags(api, tag_names).items()
+            }
+
+        if role_rules:
+            group_type_ids = {
+                masterdata.get_id_of_group_type(r.group_type) for r in role_rules
+            }
+            if groups is None:
+                groups = list(
+                    api.get_groups(group_type_ids=sorted(group_type_ids), as_model=True)
+                )
+            group_types = {
+                g.id: g.group_type_id
+                for g in groups
+                if g.group_type_id in group_type_ids
+            }
+            # role ids are unique across group types, so the members of all
+            # groups can be fetched at once, filtered by the union of the roles
+            role_ids: Optional[List[int]] = []
+            for rule in role_rules:
+                ids = rule.role_ids(masterdata)
+                if ids is None:
+                    role_ids = None
+                    break
+                role_ids.extend(ids)
+            by_role: Dict[int, List[int]] = defaultdict(list)
+            by_group_type: Dict[int, List[int]] = defaultdict(list)
+            if member_store is not None:
+                member_store.refresh(api, (g for g in groups if g.id in group_types))
+                memberships = member_store.get_members_of_groups(
+                    group_types, role_ids=role_ids
+                )
+            else:
+                memberships = api.get_members_of_groups(group_types, role_ids=role_ids)
+            for person_id, person_groups in memberships.items():
+                for group_id, role_id in person_groups:
+                    by_role[role_id].append(person_id)
+                    by_group_type[group_types[group_id]].append(person_id)
+            index.by_role = {r: IdSet(ids) for r, ids in by_role.items()}
+            index.by_group_type = {t: IdSet(ids) for t, ids in by_group_type.items()}
+        return index
+
+
+def _group_id(api: "ChurchToolsApi", name: str) -> int:
+    # the search matches parts of names, too
+    for group in api.get_groups(query=name, as_model=True):
+        if group.name == name:
+            return group.id
+    raise ValueError(f"Group '{name}' not found or not accessible!")
+
+
+class AutoGroups:
+    """Groups whose members are defined by rules.
+
+    ``rules`` maps the name of each auto-group to its rule, e.g.::
+
+        AutoGroups({
+            "Auto-Gruppe: Alle Mitarbeiter": MemberStatus(),
+            "Auto-Gruppe: Leiter": Role("Kleingruppe", "Leiter")
+            | Role("Dienst", "Leiter"),
+        })
+
+    :meth:`plan` loads the data of all rules once, evaluates every rule on
+    it and returns the membership changes of all auto-groups as one
+    :class:`ChangeSet`."""
+
+    def __init__(self, rules: Mapping[str, Rule]):
+        self.rules = dict(rules)
+
+    def evaluate(self, index: PersonIndex) -> Dict[str, IdSet]:
+        return {name: rule.evaluate(index) for name, rule in self.rules.items()}
+
+    def plan(
+        self, api: "ChurchToolsApi", persons: Iterable[Person] = None
+    ) -> ChangeSet:
+        group_ids = dict(
+            zip(
+                self.rules,
+                api.map_concurrent(lambda name: _group_id(api, name), self.rules),
+            )
+        )
+        index = PersonIndex.load(api, self.rules.values(), persons=persons)
+        desired = {group_ids[name]: ids for name, ids in self.evaluate(index).items()}
+        current: Dict[int, List[int]] = defaultdict(list)
+        for person_id, person_groups in api.get_members_of_groups(desired).items():
+            for group_id, _ in person_groups:
+                current[group_id].append(person_id)
+        labels = {group_id: name for name, group_id in group_ids.items()}
+        return group_changes(reconcile(desired, current), labels)
@@ -0,0 +1,133 @@
+import json
+import time
+from typing import TYPE_CHECKING, Iterator, List, NamedTuple, Optional, Tuple
+
+import requests
+
+if TYPE_CHECKING:
+    from . import ChurchToolsApi
+
+ADD_TO_GROUP = "add_to_group"
+REMOVE_FROM_GROUP = "remove_from_group"
+SET_PERSON_STATUS = "set_person_status"
+
+# failed changes worth another try; throttling, server and connection errors
+# are already retried by the session of the client
+APPLY_RETRY_STATUSES = {409}
+
+
+class Change(NamedTuple):
+    action: str
+    person_id: int
+    target_id: int
+    label: str = ""
+
+    def describe(self) -> str:
+        target = f"{self.target_id}"
+        if self.label:
+            target += f" ({self.label})"
+        if self.action == ADD_TO_GROUP:
+            return f"add #{self.person_id} to group {target}"
+        elif self.action == REMOVE_FROM_GROUP:
+            return f"remove #{self.person_id} from group {target}"
+        elif self.action == SET_PERSON_STATUS:
+            return f"set status of #{self.person_id} to {target}"
+        raise ValueError(f"Unknown action '{self.action}'!")
+
+    def apply(self, api: "ChurchToolsApi"):
+        if self.action == ADD_TO_GROUP:
+            api.add_to_group(who=self.person_id, to=self.target_id)
+        elif self.action == REMOVE_FROM_GROUP:
+            api.remove_from_group(who=self.person_id, from_=self.target_id)
+        elif self.action == SET_PERSON_STATUS:
+            api.set_person_status(self.person_id, self.target_id)
+        else:
+            raise ValueError(f"Unknown action '{self.action}'!")
+
+
+def _worth_retrying(error: requests.RequestException) -> bool:
+    response = error.response
+    return response is not None and response.status_code in APPLY_RETRY_STATUSES
+
+
+class ApplyResult:
+    def __init__(self, applied: List[Change], failed: List[Tuple[Change, Exception]]):
+        self.applied = applied
+        self.failed = failed
+
+    def __bool__(self):
+        return not self.failed
+
+    def summary(self) -> str:
+        lines = [f"{len(self.applied)} changes applied, {len(self.failed)} failed"]
+        for change, error in self.failed:
+            lines.append(f"- FAILED: {change.describe()}: {error}")
+        return "\n".join(lines)
+
+
+class ChangeSet:
+    """Planned mutations of group memberships and person statuses.
+
+    A change set can be printed (dry run), saved as JSON and applied. Changes
+    are applied concurrently by the worker threads of the client. Changes
+    failing with a conflict are retried a few times before they are
+    reported as failed; other errors are reported right away."""
+
+    def __init__(self, changes: List[Change] = None):
+        self._changes: List[Change] = list(changes or [])
+
+    def add_to_group(self, who: int, to: int, label: str = ""):
+        self._changes.append(Change(ADD_TO_GROUP, who, to, label))
+
+    def remove_from_group(self, who: int, from_: int, label: str = ""):
+        self._changes.append(Change(REMOVE_FROM_GROUP, who, from_, label))
+
+    def set_person_status(self, person_id: int, status_id: int, label: str = ""):
+        self._changes.append(Change(SET_PERSON_STATUS, person_id, status_id, label))
+
+    def extend(self, other: "ChangeSet"):
+        self._changes.extend(other)
+
+    def __len__(self):
+        return len(self._changes)
+
+    def __iter__(self) -> Iterator[Change]:
+        return iter(self._changes)
+
+    def describe(self) -> str:
+        return "\n".join(f"- {change.describe()}" for change in self._changes)
+
+    def to_json(self) -> str:
+        return json.dumps([change._asdict() for change in self._changes], indent=2)
+
+    @classmethod
+    def from_json(cls, text: str) -> "ChangeSet":
+        return cls([Change(**change) for change in json.loads(text)])
+
+    def apply(
+        self,
+        api: "ChurchToolsApi",
+        retries: int = 2,
+        retry_delay: float = 1.0,
+    ) -> ApplyResult:
+        def apply_change(change: Change) -> Optional[Exception]:
+            for attempt in range(retries + 1):
+                try:
+                    change.apply(api)
+                    return None
+                except requests.RequestException as e:
+                    error = e
+                    if attempt == retries or not _worth_retrying(e):
+                        break
+                    time.sleep(retry_delay * 2**attempt)
+            return error
+
+        errors = api.map_concurrent(apply_change, self._changes)
+        applied = []
+        failed = []
+        for change, error in zip(self._changes, errors):
+            if error is None:
+                applied.append(change)
+            else:
+                failed.append((change, error))
+        return ApplyResult(applied, failed)
@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple, TypeVar
+
+R = TypeVar("R")
+
+PERSON = "person"
+GROUP = "group"
+MEMBERSHIPS = "memberships"
+TAGS = "tags"
+
+_MISSING = object()
+
+
+class EntityCache:
+    """Bounded LRU cache of API entities with a time-to-live.
+
+    Entries are keyed by entity kind (e.g. ``"person"``) and id. Cached
+    values are shared between callers and must not be modified."""
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 300.0):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, Any]]" = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind: str, id_: Hashable, default=None):
+        key = (kind, id_)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return default
+
+    def get_or_load(self, kind: str, id_: Hashable, load: Callable[[], R]) -> R:
+        value = self.get(kind, id_, _MISSING)
+        if value is _MISSING:
+            value = load()
+            self.put(kind, id_, value)
+        return value
+
+    def put(self, kind: str, id_: Hashable, value):
+        key = (kind, id_)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, kind: str, id_: Hashable = None):
+        """Drop one entity, or all entities of a kind if no id is given."""
+        with self._lock:
+            if id_ is not None:
+                self._entries.pop((kind, id_), None)
+            else:
+                for key in [k for k in self._entries if k[0] == kind]:
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+            }
@@ -0,0 +1,127 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from .models import Group
+
+if TYPE_CHECKING:
+    from . import ChurchToolsApi
+
+# role changes and swapped members do not show in the fingerprint of a
+# group, a full refresh catches them; keep it well above the interval of
+# the jobs using the store, or every run is a full refresh
+DEFAULT_FULL_REFRESH_INTERVAL = 7 * 24 * 3600
+
+
+def fingerprint(group: Group) -> List:
+    """What changes in the group list when the members of a group change."""
+    return [group.member_count, group.modified_date]
+
+
+class GroupMemberStore:
+    """Local copy of the members of groups, refreshed only where needed.
+
+    For every group the store keeps its members and the fingerprint of the
+    group (member count and modification date from the group list). Groups
+    with an unchanged fingerprint are answered from the store; only the
+    others are downloaded again. Every ``full_refresh_interval`` seconds, or
+    after :meth:`clear`, all groups are downloaded.
+
+    The fingerprint misses role changes and members swapped within a day,
+    so check decisions which would take something away from a person
+    against fresh data, e.g. by refreshing a cleared store."""
+
+    def __init__(
+        self,
+        path,
+        full_refresh_interval: float = DEFAULT_FULL_REFRESH_INTERVAL,
+    ):
+        self._path = Path(path)
+        self._full_refresh_interval = full_refresh_interval
+        # group id -> (fingerprint, [(person id, role id), ...])
+        self._groups: Dict[int, Tuple[List, List[Tuple[int, int]]]] = {}
+        self._last_full_refresh = 0.0
+        if self._path.exists():
+            data = json.loads(self._path.read_text())
+            self._groups = {
+                int(group_id): (
+                    group["fingerprint"],
+                    [tuple(m) for m in group["members"]],
+                )
+                for group_id, group in data["groups"].items()
+            }
+            self._last_full_refresh = data["last_full_refresh"]
+
+    @classmethod
+    def from_environ(cls) -> Optional["GroupMemberStore"]:
+        """Return the store configured by ``CT_GROUP_STORE_PATH``, if any.
+
+        ``CT_GROUP_STORE_FULL_REFRESH_HOURS`` overrides the interval of full
+        refreshes."""
+        path = os.environ.get("CT_GROUP_STORE_PATH")
+        if not path:
+            return None
+        hours = os.environ.get("CT_GROUP_STORE_FULL_REFRESH_HOURS")
+        if hours:
+            return cls(path, full_refresh_interval=float(hours) * 3600)
+        return cls(path)
+
+    def clear(self):
+        """Forget all groups, the next refresh downloads all of them."""
+        self._groups = {}
+        self._last_full_refresh = 0.0
+
+    def refresh(self, api: "ChurchToolsApi", groups: Iterable[Group]) -> int:
+        """Download the members of all changed groups and return their number.
+
+        Groups which are not in ``groups`` any more are dropped."""
+        groups = list(groups)
+        full = time.time() - self._last_full_refresh > self._full_refresh_interval
+        stale = {
+            g.id: fingerprint(g)
+            for g in groups
+            if full
+            or g.id not in self._groups
+            or self._groups[g.id][0] != fingerprint(g)
+        }
+        members: Dict[int, List[Tuple[int, int]]] = {group_id: [] for group_id in stale}
+        for person_id, person_groups in api.get_members_of_groups(stale).items():
+            for group_id, role_id in person_groups:
+                members[group_id].append((person_id, role_id))
+        current = {g.id for g in groups}
+        self._groups = {
+            group_id: entry
+            for group_id, entry in self._groups.items()
+            if group_id in current
+        }
+        for group_id, group_fingerprint in stale.items():
+            self._groups[group_id] = (group_fingerprint, members[group_id])
+        if full:
+            self._last_full_refresh = time.time()
+        self.save()
+        return len(stale)
+
+    def save(self):
+        groups = {
+            group_id: {"fingerprint": entry[0], "members": entry[1]}
+            for group_id, entry in self._groups.items()
+        }
+        self._path.write_text(
+            json.dumps({"groups": groups, "last_full_refresh": self._last_full_refresh})
+        )
+
+    def get_members_of_groups(
+        self, group_ids: Iterable[int], role_ids: List[int] = None
+    ) -> Dict[int, List[Tuple[int, int]]]:
+        """Like :meth:`ChurchToolsApi.get_members_of_groups`, from the store."""
+        if role_ids is not None:
+            role_ids = set(role_ids)
+        memberships: Dict[int, List[Tuple[int, int]]] = {}
+        for group_id in group_ids:
+            for person_id, role_id in self._groups.get(group_id, (None, []))[1]:
+                if role_ids is not None and role_id not in role_ids:
+                    continue
+                memberships.setdefault(person_id, []).append((group_id, role_id))
+        return memberships
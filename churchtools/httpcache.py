@@ -0,0 +1,253 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import requests
+
+from .ratelimit import ThrottledSession
+
+# time-to-live in seconds per endpoint, matched against the URL path below
+# the API base URL; the first matching pattern wins, unmatched endpoints are
+# not cached at all
+DEFAULT_TTLS = {
+    r"/person/masterdata": 24 * 3600,
+    r"/statuses": 24 * 3600,
+    r"/tags": 24 * 3600,
+    r"/persons/\d+/tags": 6 * 3600,
+    r"/tags/\d+/persons": 6 * 3600,
+    r"/persons(/\d+)?": 3600,
+    r"/persons/\d+/groups": 3600,
+    r"/groups(/\d+)?": 3600,
+    r"/groups/(\d+/)?members": 3600,
+}
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class HttpCache:
+    """Persistent SQLite cache for GET responses of the ChurchTools API.
+
+    Entries are keyed by the full request URL (including the query string)
+    and the login token. Every endpoint has its own time-to-live, see
+    ``DEFAULT_TTLS``. When the cache grows beyond ``max_bytes`` the least
+    recently used entries are evicted."""
+
+    def __init__(
+        self,
+        path,
+        ttls: Dict[str, int] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self._path = Path(path)
+        self._ttls = [
+            (re.compile(pattern + "$"), ttl)
+            for pattern, ttl in (DEFAULT_TTLS if ttls is None else ttls).items()
+        ]
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self._path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " endpoint TEXT NOT NULL,"
+            " path TEXT NOT NULL,"
+            " status INTEGER NOT NULL,"
+            " headers TEXT NOT NULL,"
+            " content BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+        )
+        self._db.commit()
+
+    @classmethod
+    def from_environ(cls) -> Optional["HttpCache"]:
+        """Return the cache configured by ``CT_CACHE_PATH``, if any."""
+        path = os.environ.get("CT_CACHE_PATH")
+        if not path:
+            return None
+        return cls(path)
+
+    def ttl(self, path: str) -> int:
+        for pattern, ttl in self._ttls:
+            if pattern.match(path):
+                return ttl
+        return 0
+
+    def get(self, key: str, path: str) -> Optional[requests.Response]:
+        ttl = self.ttl(path)
+        if ttl <= 0:
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT endpoint, status, headers, content, created"
+                " FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            endpoint, status, headers, content, created = row
+            if created + ttl < now:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self._db.commit()
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update(json.loads(headers))
+        response._content = content
+        response._content_consumed = True
+        response.url = endpoint
+        return response
+
+    def set(self, key: str, path: str, response: requests.Response):
+        if self.ttl(path) <= 0:
+            return
+        now = time.time()
+        content = response.content
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses"
+                " (key, endpoint, path, status, headers, content, size,"
+                " created, accessed) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    response.url.split("?")[0],
+                    path,
+                    response.status_code,
+                    json.dumps(dict(response.headers)),
+                    content,
+                    len(content),
+                    now,
+                    now,
+                ),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        (total,) = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if total <= self._max_bytes:
+            return
+        rows = self._db.execute(
+            "SELECT key, size FROM responses ORDER BY accessed"
+        ).fetchall()
+        to_delete = []
+        for key, size in rows:
+            if total <= self._max_bytes:
+                break
+            to_delete.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", to_delete)
+
+    def invalidate(self, *paths: str):
+        """Drop all entries whose path matches one of the given glob patterns."""
+        with self._lock:
+            for path in paths:
+                self._db.execute("DELETE FROM responses WHERE path GLOB ?", (path,))
+            self._db.commit()
+
+    def purge(self, expired_only: bool = False) -> int:
+        """Delete all (or only the expired) entries and return their number."""
+        with self._lock:
+            if expired_only:
+                now = time.time()
+                rows = self._db.execute("SELECT key, path, created FROM responses")
+                keys = [
+                    (key,)
+                    for key, path, created in rows.fetchall()
+                    if created + self.ttl(path) < now
+                ]
+                self._db.executemany("DELETE FROM responses WHERE key = ?", keys)
+                count = len(keys)
+            else:
+                count = self._db.execute("DELETE FROM responses").rowcount
+            self._db.commit()
+            self._db.execute("VACUUM")
+        return count
+
+    def close(self):
+        self._db.close()
+
+
+class CachedSession(ThrottledSession):
+    """A session which answers GET requests from an HttpCache."""
+
+    def __init__(self, cache: HttpCache, base_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+        self._base_url = base_url
+
+    def request(self, method, url, params=None, **kwargs):
+        if method.upper() != "GET" or not url.startswith(self._base_url):
+            return super().request(method, url, params=params, **kwargs)
+        path = url[len(self._base_url) :]
+        full_url = requests.Request("GET", url, params=params).prepare().url
+        scope = hashlib.sha256(
+            self.headers.get("Authorization", "").encode()
+        ).hexdigest()[:16]
+        key = f"{scope} {full_url}"
+        response = self.cache.get(key, path)
+        if response is None:
+            response = super().request(method, url, params=params, **kwargs)
+            # storing a streamed response would read its whole body up front
+            if response.status_code == 200 and not kwargs.get("stream"):
+                self.cache.set(key, path, response)
+        return response
+
+
+def main():
+    from . import ChurchToolsApi
+
+    arg_parser = argparse.ArgumentParser(
+        prog="ct-cache", description="Manage the ChurchTools HTTP cache"
+    )
+    arg_parser.add_argument(
+        "--path",
+        default=os.environ.get("CT_CACHE_PATH"),
+        help="Cache file (default: $CT_CACHE_PATH)",
+    )
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    commands.add_parser(
+        "warm", help="Download persons, groups, statuses and master data"
+    )
+    purge_parser = commands.add_parser("purge", help="Delete cached responses")
+    purge_parser.add_argument(
+        "--expired", action="store_true", help="Only delete expired responses"
+    )
+    args = arg_parser.parse_args()
+    if not args.path:
+        arg_parser.error("No cache file given, use --path or set CT_CACHE_PATH")
+
+    cache = HttpCache(args.path)
+    if args.command == "warm":
+        api = ChurchToolsApi(
+            os.environ["API_BASE_URL"], os.environ["ADMIN_TOKEN"], cache=cache
+        )
+        api.get_masterdata()
+        print(f"{len(list(api.get_statuses()))} statuses")
+        print(f"{len(list(api.get_persons()))} persons")
+        print(f"{len(list(api.get_groups()))} groups")
+    elif args.command == "purge":
+        print(f"Deleted {cache.purge(expired_only=args.expired)} cached responses")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import codecs
+import json
+from typing import Any, Dict, Iterable, Iterator
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# bytes read from the response body at a time when streaming
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+_decoder = json.JSONDecoder()
+
+
+def loads(data: bytes) -> Any:
+    """Decode a JSON document, with orjson if it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class _Reader:
+    """Text buffer over a stream of UTF-8 chunks, filled on demand."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Append the next chunk and drop consumed text; False at the end."""
+        if self.eof:
+            return False
+        for chunk in self._chunks:
+            text = self._utf8.decode(chunk)
+            if text:
+                self.buffer = self.buffer[self.pos :] + text
+                self.pos = 0
+                return True
+        self.buffer = self.buffer[self.pos :] + self._utf8.decode(b"", final=True)
+        self.pos = 0
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ("" at the end)."""
+        while True:
+            buffer = self.buffer
+            while self.pos < len(buffer) and buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(buffer):
+                return buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(
+                f"Expecting one of {chars!r}", self.buffer, self.pos
+            )
+        self.pos += 1
+        return char
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            if end == len(self.buffer) and not self.eof:
+                # a number could continue in the next chunk
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_items(
+    chunks: Iterable[bytes], key: str = "data", rest: Dict[str, Any] = None
+) -> Iterator[Any]:
+    """Yield the items of the array ``key`` of a JSON object while it is read.
+
+    ``chunks`` is the raw document, e.g. ``response.iter_content()``. Only
+    one item is decoded at a time. The other members of the object are
+    decoded as a whole and stored in ``rest``, which is complete once the
+    generator is exhausted."""
+    reader = _Reader(chunks)
+    if rest is None:
+        rest = {}
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        name = reader.value()
+        reader.expect(":")
+        if name == key and reader.peek() == "[":
+            reader.pos += 1
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.expect(",]") == "]":
+                        break
+        else:
+            rest[name] = reader.value()
+        if reader.expect(",}") == "}":
+            return
@@ -0,0 +1,68 @@
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    from . import ChurchToolsApi
+
+
+class MasterData:
+    """Snapshot of the ChurchTools master data (group types, roles, statuses).
+
+    The data is downloaded once, on first access, and indexed by name so that
+    lookups do not cost any further requests. Call :meth:`refresh` to
+    download it again."""
+
+    def __init__(self, api: "ChurchToolsApi"):
+        self._api = api
+        self._loaded = False
+        self._group_type_ids: Dict[str, int] = {}
+        self._group_role_ids: Dict[Tuple[int, str], int] = {}
+        self._status_ids: Dict[str, int] = {}
+        self._statuses: List[Dict] = []
+
+    def refresh(self):
+        masterdata = self._api.get_masterdata()
+        statuses = list(self._api.get_statuses())
+        self._group_type_ids = {
+            g["name"]: int(g["id"]) for g in reversed(masterdata["groupTypes"])
+        }
+        self._group_role_ids = {
+            (int(r["groupTypeId"]), r["name"]): int(r["id"])
+            for r in reversed(masterdata["roles"])
+        }
+        self._status_ids = {s["name"]: s["id"] for s in statuses}
+        self._statuses = statuses
+        self._loaded = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.refresh()
+
+    @property
+    def statuses(self) -> List[Dict]:
+        self._ensure_loaded()
+        return self._statuses
+
+    @property
+    def status_ids(self) -> Dict[str, int]:
+        self._ensure_loaded()
+        return self._status_ids
+
+    @property
+    def member_status_ids(self) -> List[int]:
+        return [s["id"] for s in self.statuses if s["isMember"]]
+
+    def get_id_of_group_type(self, group_type: str) -> int:
+        self._ensure_loaded()
+        try:
+            return self._group_type_ids[group_type]
+        except KeyError:
+            raise ValueError(f"No group type found for '{group_type}'!") from None
+
+    def get_id_of_group_role(self, group_type_id: int, group_role: str) -> int:
+        self._ensure_loaded()
+        try:
+            return self._group_role_ids[(int(group_type_id), group_role)]
+        except KeyError:
+            raise ValueError(
+                f"No group role found for group ID '{group_type_id}'!"
+            ) from None
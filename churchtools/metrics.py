@@ -0,0 +1,192 @@
+import atexit
+import os
+import re
+import sys
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# upper bounds (in seconds) of the latency histogram buckets
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+_ID_SEGMENT = re.compile(r"/(\d+|[0-9a-fA-F-]{32,36})(?=/|$)")
+
+
+def normalize_endpoint(path: str) -> str:
+    """Replace ids in a URL path by a placeholder, e.g. `/persons/{id}/tags`."""
+    return _ID_SEGMENT.sub("/{id}", path.split("?")[0])
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Per-endpoint HTTP client metrics.
+
+    Requests are counted by service (e.g. `churchtools`), HTTP method,
+    endpoint template and status code; response bytes and latencies are
+    tracked per endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, str, str, str], int] = defaultdict(int)
+        self._bytes: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self._latencies: Dict[Tuple[str, str, str], _Histogram] = defaultdict(
+            _Histogram
+        )
+
+    def observe(
+        self,
+        service: str,
+        method: str,
+        endpoint: str,
+        status,
+        seconds: float,
+        size: Optional[int] = None,
+    ):
+        key = (service, method.upper(), endpoint)
+        with self._lock:
+            self._requests[key + (str(status),)] += 1
+            if size is not None:
+                self._bytes[key] += size
+            self._latencies[key].observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._requests.clear()
+            self._bytes.clear()
+            self._latencies.clear()
+
+    def to_prometheus(self, job: str) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+
+        def labels(**kwargs):
+            return ",".join(f'{k}="{_escape(v)}"' for k, v in kwargs.items())
+
+        lines = [
+            "# HELP http_client_requests_total Number of HTTP requests.",
+            "# TYPE http_client_requests_total counter",
+        ]
+        with self._lock:
+            for (service, method, endpoint, status), n in sorted(
+                self._requests.items()
+            ):
+                lines.append(
+                    "http_client_requests_total{"
+                    + labels(
+                        job=job,
+                        service=service,
+                        method=method,
+                        endpoint=endpoint,
+                        status=status,
+                    )
+                    + f"}} {n}"
+                )
+            lines += [
+                "# HELP http_client_response_bytes_total Size of HTTP responses.",
+                "# TYPE http_client_response_bytes_total counter",
+            ]
+            for (service, method, endpoint), n in sorted(self._bytes.items()):
+                lines.append(
+                    "http_client_response_bytes_total{"
+                    + labels(job=job, service=service, method=method, endpoint=endpoint)
+                    + f"}} {n}"
+                )
+            lines += [
+                "# HELP http_client_request_duration_seconds HTTP request latency.",
+                "# TYPE http_client_request_duration_seconds histogram",
+            ]
+            for (service, method, endpoint), hist in sorted(self._latencies.items()):
+                common = labels(
+                    job=job, service=service, method=method, endpoint=endpoint
+                )
+                cumulative = 0
+                for bound, n in zip(BUCKETS, hist.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(
+                        "http_client_request_duration_seconds_bucket"
+                        f'{{{common},le="{le}"}} {cumulative}'
+                    )
+                lines.append(
+                    f"http_client_request_duration_seconds_sum{{{common}}} {hist.sum}"
+                )
+                lines.append(
+                    "http_client_request_duration_seconds_count"
+                    f"{{{common}}} {hist.count}"
+                )
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, directory, job: str) -> Path:
+        """Write `<job>.prom` for the node exporter's textfile collector.
+
+        The file is written atomically, so the collector never reads a
+        partially written file."""
+        target = Path(directory) / f"{job}.prom"
+        tmp = target.with_suffix(f".prom.{os.getpid()}.tmp")
+        tmp.write_text(self.to_prometheus(job))
+        tmp.replace(target)
+        return target
+
+    def summary(self) -> str:
+        """Human-readable table of requests per endpoint, slowest first."""
+        with self._lock:
+            counts: Dict[Tuple[str, str, str], int] = defaultdict(int)
+            for (service, method, endpoint, _), n in self._requests.items():
+                counts[(service, method, endpoint)] += n
+            rows = sorted(
+                (
+                    (hist.sum, key, counts[key], self._bytes.get(key))
+                    for key, hist in self._latencies.items()
+                ),
+                reverse=True,
+            )
+        lines = [f"{'requests':>8} {'seconds':>8} {'kB':>8}  endpoint"]
+        for seconds, (service, method, endpoint), n, size in rows:
+            kb = "-" if size is None else f"{size / 1024:.0f}"
+            lines.append(
+                f"{n:>8} {seconds:>8.2f} {kb:>8}  {service} {method} {endpoint}"
+            )
+        return "\n".join(lines)
+
+    def dump_at_exit(self, job: str, textfile_dir=None, summary: bool = False):
+        def dump():
+            if textfile_dir:
+                self.write_textfile(textfile_dir, job)
+            if summary:
+                print(self.summary(), file=sys.stderr)
+
+        atexit.register(dump)
+
+
+REGISTRY = Metrics()
+
+
+def dump_at_exit_from_environ(job: str):
+    """Dump the metrics of this process at exit, as configured by the environment.
+
+    ``PROMETHEUS_TEXTFILE_DIR`` selects the directory of the textfile
+    collector; if ``METRICS_SUMMARY`` is set, a summary is printed to
+    stderr."""
+    REGISTRY.dump_at_exit(
+        job,
+        textfile_dir=os.environ.get("PROMETHEUS_TEXTFILE_DIR"),
+        summary=bool(os.environ.get("METRICS_SUMMARY")),
+    )
@@ -0,0 +1,146 @@
+import json
+from typing import Dict, Optional
+
+
+class _Model:
+    """Base of the compact API models.
+
+    Only the fields the scripts need are kept as attributes. With
+    ``keep_raw=True`` the complete payload is kept, too, as compact JSON
+    bytes decoded on access of :attr:`raw`.
+
+    Models are hashed by their identifying fields (``_key``), so they can be
+    used in sets and as dict keys; do not modify them afterwards."""
+
+    __slots__ = ("_raw",)
+    _key = ("id",)
+
+    def __init__(self, raw: Optional[bytes]):
+        self._raw = raw
+
+    @staticmethod
+    def _encode(data: Dict) -> bytes:
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+
+    @property
+    def raw(self) -> Dict:
+        """The full JSON payload as returned by the API."""
+        if self._raw is None:
+            raise ValueError(f"{type(self).__name__} was created without payload")
+        return json.loads(self._raw)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __hash__(self):
+        return hash((type(self),) + tuple(getattr(self, name) for name in self._key))
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Person(_Model):
+    __slots__ = ("id", "status_id", "first_name", "last_name", "default_email")
+
+    def __init__(
+        self,
+        id: int,
+        status_id: int,
+        first_name: str = "",
+        last_name: str = "",
+        default_email: Optional[str] = None,
+        raw: bytes = None,
+    ):
+        super().__init__(raw)
+        self.id = id
+        self.status_id = status_id
+        self.first_name = first_name
+        self.last_name = last_name
+        self.default_email = default_email
+
+    @classmethod
+    def from_json(cls, data: Dict, keep_raw: bool = False) -> "Person":
+        default_email = None
+        for email in data.get("emails", []):
+            if email["isDefault"]:
+                default_email = email["email"]
+                break
+        return cls(
+            data["id"],
+            data.get("statusId"),
+            data.get("firstName", ""),
+            data.get("lastName", ""),
+            default_email,
+            cls._encode(data) if keep_raw else None,
+        )
+
+
+class Group(_Model):
+    __slots__ = ("id", "name", "group_type_id", "member_count", "modified_date")
+
+    def __init__(
+        self,
+        id: int,
+        name: str,
+        group_type_id: Optional[int],
+        member_count: Optional[int] = None,
+        modified_date: Optional[str] = None,
+        raw: bytes = None,
+    ):
+        super().__init__(raw)
+        self.id = id
+        self.name = name
+        self.group_type_id = group_type_id
+        self.member_count = member_count
+        self.modified_date = modified_date
+
+    @classmethod
+    def from_json(cls, data: Dict, keep_raw: bool = False) -> "Group":
+        return cls(
+            data["id"],
+            data.get("name", ""),
+            data.get("information", {}).get("groupTypeId"),
+            data.get("memberCount"),
+            data.get("meta", {}).get("modifiedDate"),
+            cls._encode(data) if keep_raw else None,
+        )
+
+
+class GroupMember(_Model):
+    __slots__ = ("person_id", "group_id", "role_id", "status")
+    _key = ("person_id", "group_id")
+
+    def __init__(
+        self,
+        person_id: int,
+        group_id: Optional[int],
+        role_id: Optional[int],
+        status: Optional[str],
+        raw: bytes = None,
+    ):
+        super().__init__(raw)
+        self.person_id = person_id
+        self.group_id = group_id
+        self.role_id = role_id
+        self.status = status
+
+    @property
+    def is_active(self) -> bool:
+        return self.status == "active"
+
+    @classmethod
+    def from_json(
+        cls, data: Dict, group_id: int = None, keep_raw: bool = False
+    ) -> "GroupMember":
+        return cls(
+            data["personId"],
+            data.get("groupId", group_id),
+            data.get("groupTypeRoleId"),
+            data.get("groupMemberStatus"),
+            cls._encode(data) if keep_raw else None,
+        )
@@ -0,0 +1,131 @@
+import datetime
+import json
+import os
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, Optional
+
+from .reconcile import IdSet
+
+if TYPE_CHECKING:
+    from . import ChurchToolsApi
+
+# a full download catches deleted persons, which a delta cannot see
+DEFAULT_FULL_RECONCILE_INTERVAL = 7 * 24 * 3600
+
+
+def as_utc(value: datetime.datetime) -> datetime.datetime:
+    """Return ``value`` in UTC; naive datetimes are taken to be UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc)
+
+
+def modified_date(entity: Dict) -> Optional[datetime.datetime]:
+    """Return `meta.modifiedDate` of a person or group in UTC, if it has one."""
+    value = (entity.get("meta") or {}).get("modifiedDate")
+    if value is None:
+        return None
+    return as_utc(datetime.datetime.fromisoformat(value.replace("Z", "+00:00")))
+
+
+class PersonStore:
+    """Local copy of all persons, kept up to date with delta downloads.
+
+    The store remembers the newest `meta.modifiedDate` it has seen. A
+    :meth:`refresh` only downloads persons modified since then and merges
+    them into the local copy. Every ``full_reconcile_interval`` seconds all
+    persons are downloaded again to drop deleted persons. If the server
+    turns out to ignore the `modified_after` filter, every refresh is a full
+    download.
+
+    Of persons only id, status and `meta.modifiedDate` are kept, so that no
+    personal data ends up in the store file."""
+
+    def __init__(
+        self,
+        path,
+        full_reconcile_interval: float = DEFAULT_FULL_RECONCILE_INTERVAL,
+    ):
+        self._path = Path(path)
+        self._full_reconcile_interval = full_reconcile_interval
+        self._persons: Dict[int, Dict] = {}
+        self._high_water_mark: Optional[datetime.datetime] = None
+        self._last_full_sync = 0.0
+        if self._path.exists():
+            data = json.loads(self._path.read_text())
+            self._persons = {p["id"]: p for p in data["persons"]}
+            if data["high_water_mark"] is not None:
+                self._high_water_mark = as_utc(
+                    datetime.datetime.fromisoformat(data["high_water_mark"])
+                )
+            self._last_full_sync = data["last_full_sync"]
+
+    @classmethod
+    def from_environ(cls) -> Optional["PersonStore"]:
+        """Return the store configured by ``CT_PERSON_STORE_PATH``, if any."""
+        path = os.environ.get("CT_PERSON_STORE_PATH")
+        if not path:
+            return None
+        return cls(path)
+
+    def refresh(self, api: "ChurchToolsApi", full: bool = False) -> int:
+        """Update the local copy and return the number of downloaded persons."""
+        full = (
+            full
+            or self._high_water_mark is None
+            # the server sends all persons anyway, so take them all
+            or api.modified_after_ignored
+            or time.time() - self._last_full_sync > self._full_reconcile_interval
+        )
+        if full:
+            self._persons = {}
+            persons = api.get_persons()
+        else:
+            persons = api.get_persons(modified_after=self._high_water_mark)
+        count = 0
+        for person in persons:
+            count += 1
+            self._persons[person["id"]] = {
+                "id": person["id"],
+                "statusId": person["statusId"],
+                "meta": {
+                    "modifiedDate": (person.get("meta") or {}).get("modifiedDate")
+                },
+            }
+            modified = modified_date(person)
+            if modified is None:
+                continue
+            if self._high_water_mark is None or modified > self._high_water_mark:
+                self._high_water_mark = modified
+        if full:
+            self._last_full_sync = time.time()
+        self.save()
+        return count
+
+    def save(self):
+        high_water_mark = self._high_water_mark
+        self._path.write_text(
+            json.dumps(
+                {
+                    "persons": list(self._persons.values()),
+                    "high_water_mark": high_water_mark and high_water_mark.isoformat(),
+                    "last_full_sync": self._last_full_sync,
+                }
+            )
+        )
+
+    def __len__(self):
+        return len(self._persons)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self._persons.values())
+
+    def get(self, person_id: int) -> Optional[Dict]:
+        return self._persons.get(person_id)
+
+    def ids_with_status(self, status_ids: Iterable[int]) -> IdSet:
+        status_ids = set(status_ids)
+        return IdSet(
+            p["id"] for p in self._persons.values() if p["statusId"] in status_ids
+        )
@@ -0,0 +1,140 @@
+import email.utils
+import random
+import threading
+import time
+from typing import Optional
+
+import requests
+
+# responses telling that the server is overloaded
+THROTTLING_STATUSES = {429, 503}
+# responses which are worth another try
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# methods which can safely be sent again after a server error; every method
+# is retried on 429, because the server did not process the request at all.
+# Other requests opt in with ``idempotent=True``.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class AimdLimiter:
+    """Concurrency limit with additive increase and multiplicative decrease.
+
+    Every throttled response multiplies the limit by ``decrease_factor``;
+    every successful one raises it by ``1 / limit``, i.e. by about one after
+    a full round of requests, up to ``max_limit``."""
+
+    def __init__(
+        self, max_limit: int, min_limit: int = 1, decrease_factor: float = 0.5
+    ):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.decrease_factor = decrease_factor
+        self.limit = float(max_limit)
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, throttled: bool = False):
+        with self._condition:
+            self._in_flight -= 1
+            if throttled:
+                self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class RetryPolicy:
+    """When and how long to wait before a request is sent again.
+
+    ``Retry-After`` headers are honored; otherwise the delay grows
+    exponentially with full jitter, capped at ``max_backoff`` seconds."""
+
+    def __init__(
+        self, retries: int = 5, backoff: float = 0.5, max_backoff: float = 30.0
+    ):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def should_retry(
+        self,
+        method: str,
+        attempt: int,
+        response: requests.Response = None,
+        idempotent: bool = None,
+    ) -> bool:
+        if attempt >= self.retries:
+            return False
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        if response is None:
+            return idempotent
+        if response.status_code == 429:
+            return True
+        return response.status_code in RETRY_STATUSES and idempotent
+
+    def delay(self, attempt: int, response: requests.Response = None) -> float:
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Return the seconds to wait from a `Retry-After` header."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
+
+
+class ThrottledSession(requests.Session):
+    """A ``requests.Session`` which retries throttled and failed requests.
+
+    All sessions of one client share the limiter, so the number of requests
+    in flight adapts to what the server tolerates. Pass ``idempotent=True``
+    to retry a request whose method is not idempotent in general, e.g. a
+    PATCH which sets a field to a fixed value."""
+
+    def __init__(self, limiter: AimdLimiter = None, retry: RetryPolicy = None):
+        super().__init__()
+        self.limiter = limiter
+        self.retry = retry if retry is not None else RetryPolicy()
+
+    def request(self, method, url, *args, idempotent: bool = None, **kwargs):
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                self.limiter.acquire()
+            response = None
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if not self.retry.should_retry(method, attempt, idempotent=idempotent):
+                    raise
+            finally:
+                if self.limiter is not None:
+                    self.limiter.release(
+                        throttled=response is None
+                        or response.status_code in THROTTLING_STATUSES
+                    )
+            if response is not None:
+                if not self.retry.should_retry(method, attempt, response, idempotent):
+                    return response
+                response.close()
+            time.sleep(self.retry.delay(attempt, response))
+            attempt += 1
@@ -0,0 +1,153 @@
+from typing import (
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    Mapping,
+    NamedTuple,
+    Sized,
+    TypeVar,
+)
+
+from .changeset import ChangeSet
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+K = TypeVar("K", bound=Hashable)
+
+
+class IdSet:
+    """Immutable set of ids.
+
+    With NumPy installed the ids are kept in a sorted ``int64`` array, about
+    8 bytes per id instead of the ~60 of a Python ``set``, and set
+    operations are NumPy's vectorized ``setdiff1d``, ``intersect1d`` and
+    ``union1d``. Without NumPy the ids are kept in a ``frozenset``. Either
+    way ids are iterated in ascending order, and id sets are hashable and
+    compare equal to Python sets with the same ids."""
+
+    __slots__ = ("_ids",)
+
+    def __init__(self, ids: Iterable[int] = ()):
+        if isinstance(ids, IdSet):
+            self._ids = ids._ids
+        elif numpy is None:
+            self._ids = frozenset(ids)
+        else:
+            count = len(ids) if isinstance(ids, Sized) else -1
+            array = numpy.fromiter(ids, dtype=numpy.int64, count=count)
+            # sort and drop duplicates by hand, numpy.unique is much slower
+            array.sort()
+            keep = numpy.empty(len(array), dtype=bool)
+            keep[:1] = True
+            numpy.not_equal(array[1:], array[:-1], out=keep[1:])
+            self._ids = array[keep]
+
+    @classmethod
+    def _from_ids(cls, ids) -> "IdSet":
+        id_set = cls.__new__(cls)
+        id_set._ids = ids
+        return id_set
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[int]:
+        if numpy is None:
+            return iter(sorted(self._ids))
+        return iter(self._ids.tolist())
+
+    def __contains__(self, id_: int) -> bool:
+        if numpy is None:
+            return id_ in self._ids
+        i = numpy.searchsorted(self._ids, id_)
+        return bool(i < len(self._ids) and self._ids[i] == id_)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, IdSet):
+            if numpy is None:
+                return self._ids == other._ids
+            return numpy.array_equal(self._ids, other._ids)
+        if isinstance(other, (set, frozenset)):
+            return len(self) == len(other) and all(i in other for i in self)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        # equal to the hash of a frozenset, which compares equal
+        return hash(frozenset(self))
+
+    def __repr__(self) -> str:
+        return f"IdSet({list(self)!r})"
+
+    def __sub__(self, other: Iterable[int]) -> "IdSet":
+        b = IdSet(other)._ids
+        if numpy is None:
+            return self._from_ids(self._ids - b)
+        return self._from_ids(numpy.setdiff1d(self._ids, b, assume_unique=True))
+
+    def __and__(self, other: Iterable[int]) -> "IdSet":
+        b = IdSet(other)._ids
+        if numpy is None:
+            return self._from_ids(self._ids & b)
+        return self._from_ids(numpy.intersect1d(self._ids, b, assume_unique=True))
+
+    def __or__(self, other: Iterable[int]) -> "IdSet":
+        b = IdSet(other)._ids
+        if numpy is None:
+            return self._from_ids(self._ids | b)
+        return self._from_ids(numpy.union1d(self._ids, b))
+
+
+class Diff(NamedTuple):
+    add: IdSet
+    remove: IdSet
+    keep: IdSet
+
+
+def diff(desired: Iterable[int], current: Iterable[int]) -> Diff:
+    """Which ids have to be added to and removed from ``current``."""
+    desired = IdSet(desired)
+    current = IdSet(current)
+    keep = desired & current
+    return Diff(desired - keep, current - keep, keep)
+
+
+def reconcile(
+    desired: Mapping[K, Iterable[int]], current: Mapping[K, Iterable[int]]
+) -> Dict[K, Diff]:
+    """Diff many targets (e.g. groups) at once.
+
+    Targets missing in ``current`` are treated as empty, targets missing in
+    ``desired`` are left alone. Pass :class:`IdSet` instances to share one
+    desired set between several targets without converting it again."""
+    converted: Dict[int, IdSet] = {}
+
+    def as_id_set(ids: Iterable[int]) -> IdSet:
+        if isinstance(ids, IdSet):
+            return ids
+        key = id(ids)
+        if key not in converted:
+            converted[key] = IdSet(ids)
+        return converted[key]
+
+    return {
+        target: diff(as_id_set(ids), as_id_set(current.get(target, ())))
+        for target, ids in desired.items()
+    }
+
+
+def group_changes(
+    diffs: Mapping[int, Diff], labels: Mapping[int, str] = None
+) -> ChangeSet:
+    """Plan the membership changes of the groups diffed by :func:`reconcile`."""
+    changes = ChangeSet()
+    for group_id, group_diff in diffs.items():
+        label = (labels or {}).get(group_id, "")
+        for person_id in group_diff.add:
+            changes.add_to_group(who=person_id, to=group_id, label=label)
+        for person_id in group_diff.remove:
+            changes.remove_from_group(who=person_id, from_=group_id, label=label)
+    return changes
@@ -0,0 +1,61 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Mapping, TypeVar
+from urllib.parse import urlencode
+
+R = TypeVar("R")
+
+
+def request_key(url: str, params: Mapping[str, Any] = None) -> str:
+    """Key identifying a GET request by its URL and (unordered) parameters."""
+    if not params:
+        return url
+    return url + "?" + urlencode(sorted(params.items()), doseq=True)
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one.
+
+    While a call for a key is running, further calls for that key wait for
+    it and get the same result (or exception) instead of doing the work
+    again. Results are shared, callers must not modify them."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], R]) -> R:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """Asyncio variant of :class:`SingleFlight`."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[R]]) -> R:
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        # a cancelled caller must not cancel the call for the other waiters
+        return await asyncio.shield(task)
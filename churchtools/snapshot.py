@@ -0,0 +1,160 @@
+import json
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Set, Tuple
+
+if TYPE_CHECKING:
+    from . import ChurchToolsApi
+
+ACTIVE_GROUP_STATUS_ID = 1
+
+
+class ChurchToolsSnapshot:
+    """In-memory copy of all persons, groups and group memberships.
+
+    The data is loaded once with a handful of bulk requests and indexed so
+    that the usual questions (groups of a type, persons with a status or a
+    role, groups of a person) are answered without further requests. A
+    snapshot can be written to and read from a JSON file.
+
+    Inactive groups are included; pass ``active_only=True`` to leave them
+    out of role and membership lookups. Of persons only id and status are
+    kept, of groups only id, name, group type and group status."""
+
+    def __init__(
+        self,
+        persons: List[Dict],
+        groups: List[Dict],
+        memberships: Iterable[Tuple[int, int, int]],
+        created: float = None,
+    ):
+        self.created = time.time() if created is None else created
+        self._persons = persons
+        self._groups = groups
+        self._memberships = [tuple(m) for m in memberships]
+
+        self.persons_by_id: Dict[int, Dict] = {p["id"]: p for p in persons}
+        self.groups_by_id: Dict[int, Dict] = {g["id"]: g for g in groups}
+        self._groups_by_type: Dict[int, List[int]] = defaultdict(list)
+        for group in groups:
+            group_type_id = group["information"]["groupTypeId"]
+            self._groups_by_type[group_type_id].append(group["id"])
+        self._persons_by_status: Dict[int, Set[int]] = defaultdict(set)
+        for person in persons:
+            self._persons_by_status[person["statusId"]].add(person["id"])
+        self._active_group_ids = {
+            g["id"]
+            for g in groups
+            # snapshots of older versions only have active groups
+            if g["information"].get("groupStatusId", ACTIVE_GROUP_STATUS_ID)
+            == ACTIVE_GROUP_STATUS_ID
+        }
+        self._persons_by_role: Dict[int, Set[int]] = defaultdict(set)
+        self._active_persons_by_role: Dict[int, Set[int]] = defaultdict(set)
+        self._person_groups: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        self._group_members: Dict[int, Dict[int, int]] = defaultdict(dict)
+        for person_id, group_id, role_id in self._memberships:
+            self._persons_by_role[role_id].add(person_id)
+            if group_id in self._active_group_ids:
+                self._active_persons_by_role[role_id].add(person_id)
+            self._person_groups[person_id].append((group_id, role_id))
+            self._group_members[group_id][person_id] = role_id
+
+    @classmethod
+    def load(cls, api: "ChurchToolsApi") -> "ChurchToolsSnapshot":
+        # only ids, status, group type and group status are kept, so that no
+        # personal data ends up in snapshot files
+        persons = [
+            {"id": p["id"], "statusId": p["statusId"]} for p in api.get_persons()
+        ]
+        groups = [
+            {
+                "id": g["id"],
+                "name": g.get("name", ""),
+                "information": {
+                    "groupTypeId": g["information"]["groupTypeId"],
+                    "groupStatusId": g["information"].get("groupStatusId"),
+                },
+            }
+            for g in api.get_groups(include_inactive=True)
+        ]
+        memberships = [
+            (person_id, group_id, role_id)
+            for person_id, person_groups in api.get_members_of_groups(
+                g["id"] for g in groups
+            ).items()
+            for group_id, role_id in person_groups
+        ]
+        return cls(persons, groups, memberships)
+
+    @classmethod
+    def load_cached(
+        cls, api: "ChurchToolsApi", path, max_age: float
+    ) -> "ChurchToolsSnapshot":
+        """Reuse the snapshot in `path` if it is younger than `max_age` seconds.
+
+        Otherwise a new snapshot is loaded and written to `path`."""
+        path = Path(path)
+        if path.exists():
+            snapshot = cls.from_file(path)
+            if time.time() - snapshot.created < max_age:
+                return snapshot
+        snapshot = cls.load(api)
+        snapshot.to_file(path)
+        return snapshot
+
+    @classmethod
+    def from_file(cls, path) -> "ChurchToolsSnapshot":
+        data = json.loads(Path(path).read_text())
+        return cls(
+            data["persons"], data["groups"], data["memberships"], data["created"]
+        )
+
+    def to_file(self, path):
+        Path(path).write_text(
+            json.dumps(
+                {
+                    "created": self.created,
+                    "persons": self._persons,
+                    "groups": self._groups,
+                    "memberships": self._memberships,
+                }
+            )
+        )
+
+    @property
+    def persons(self) -> List[Dict]:
+        return self._persons
+
+    @property
+    def groups(self) -> List[Dict]:
+        return self._groups
+
+    def groups_of_type(self, group_type_id: int) -> List[Dict]:
+        return [self.groups_by_id[g] for g in self._groups_by_type[group_type_id]]
+
+    def persons_with_status(self, status_ids: Iterable[int]) -> Set[int]:
+        return set().union(*(self._persons_by_status[s] for s in status_ids))
+
+    def persons_with_role(
+        self, role_ids: Iterable[int], active_only: bool = False
+    ) -> Set[int]:
+        by_role = self._active_persons_by_role if active_only else self._persons_by_role
+        return set().union(*(by_role[r] for r in role_ids))
+
+    def memberships(
+        self, person_id: int, active_only: bool = False
+    ) -> List[Tuple[int, int]]:
+        """Return (group id, role id) of all groups the person is member of."""
+        memberships = self._person_groups.get(person_id, [])
+        if active_only:
+            return [m for m in memberships if m[0] in self._active_group_ids]
+        return memberships
+
+    def members(self, group_id: int, role_ids: Iterable[int] = None) -> Set[int]:
+        members = self._group_members.get(group_id, {})
+        if role_ids is None:
+            return set(members)
+        role_ids = set(role_ids)
+        return {p for p, r in members.items() if r in role_ids}
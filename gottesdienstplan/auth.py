@@ -1,6 +1,9 @@
 import json
 import os
+from functools import lru_cache
 
+import google_auth_httplib2
+import httplib2
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 
@@ -8,7 +11,22 @@ SCOPES = [
     "https://www.googleapis.com/auth/spreadsheets",
     "https://www.googleapis.com/auth/drive",
 ]
-credentials = service_account.Credentials.from_service_account_info(
-    json.loads(os.environ["GOOGLE_SERVICE_ACCOUNT"]), scopes=SCOPES
-)
-spreadsheet_service = build("sheets", "v4", credentials=credentials)
+
+
+@lru_cache(maxsize=None)
+def get_credentials() -> service_account.Credentials:
+    """Credentials of the service account in ``GOOGLE_SERVICE_ACCOUNT``."""
+    return service_account.Credentials.from_service_account_info(
+        json.loads(os.environ["GOOGLE_SERVICE_ACCOUNT"]), scopes=SCOPES
+    )
+
+
+@lru_cache(maxsize=None)
+def spreadsheet_service():
+    """The Sheets API client, built on first use."""
+    return build("sheets", "v4", credentials=get_credentials())
+
+
+def authorized_http() -> google_auth_httplib2.AuthorizedHttp:
+    """A new authorized connection; httplib2 connections are not thread-safe."""
+    return google_auth_httplib2.AuthorizedHttp(get_credentials(), http=httplib2.Http())
@@ -0,0 +1,97 @@
+import datetime
+import re
+from functools import lru_cache
+
+MONTHS = {
+    "jan": 1,
+    "januar": 1,
+    "feb": 2,
+    "februar": 2,
+    "mär": 3,
+    "mrz": 3,
+    "märz": 3,
+    "maerz": 3,
+    "apr": 4,
+    "april": 4,
+    "mai": 5,
+    "jun": 6,
+    "juni": 6,
+    "jul": 7,
+    "juli": 7,
+    "aug": 8,
+    "august": 8,
+    "sep": 9,
+    "sept": 9,
+    "september": 9,
+    "okt": 10,
+    "oktober": 10,
+    "nov": 11,
+    "november": 11,
+    "dez": 12,
+    "dezember": 12,
+}
+
+# optional weekday ("So.," or "Sonntag,") before the date, optional time after
+_WEEKDAY = r"(?:[^\W\d_]+\.?,?\s+)?"
+_TIME = r"(?:,?\s+(?P<hour>\d{1,2})[:.](?P<minute>\d{2})(?:\s*Uhr)?)?"
+_NUMERIC_DATE = re.compile(
+    _WEEKDAY + r"(?P<day>\d{1,2})\.(?P<month>\d{1,2})\.(?P<year>\d{4}|\d{2})" + _TIME
+)
+_TEXTUAL_DATE = re.compile(
+    _WEEKDAY
+    + r"(?P<day>\d{1,2})\.?\s*(?P<month>[^\W\d_]+)\.?\s+(?P<year>\d{4})"
+    + _TIME
+)
+
+
+def parse_date(value: str) -> datetime.datetime:
+    """Parse a German date of the plan, e.g. "So., 05.01.2025" or "5. Jan 2025".
+
+    The formats of the plan are parsed with regular expressions; anything
+    else is handed to ``dateparser``. Results are memoized, because the
+    same dates show up again and again."""
+    return _parse_date(value.strip())
+
+
+@lru_cache(maxsize=4096)
+def _parse_date(value: str) -> datetime.datetime:
+    date = _parse_known_format(value)
+    if date is None:
+        # dateparser is slow to import and to run, only use it for odd values
+        import dateparser
+
+        try:
+            date = dateparser.parse(
+                value, settings={"TIMEZONE": "CET"}, languages=["de"]
+            )
+        except ValueError:
+            date = None
+    if date is None:
+        raise ValueError(f"Invalid 'Datum': {value}")
+    return date
+
+
+def _parse_known_format(value: str):
+    match = _NUMERIC_DATE.fullmatch(value)
+    if match is not None:
+        month = int(match["month"])
+    else:
+        match = _TEXTUAL_DATE.fullmatch(value)
+        if match is None:
+            return None
+        month = MONTHS.get(match["month"].lower())
+        if month is None:
+            return None
+    year = int(match["year"])
+    if year < 100:
+        year += 2000
+    try:
+        return datetime.datetime(
+            year,
+            month,
+            int(match["day"]),
+            int(match["hour"] or 0),
+            int(match["minute"] or 0),
+        )
+    except ValueError:
+        return None
@@ -1,32 +1,75 @@
 import datetime
 import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from itertools import zip_longest
-from typing import Generator, List, Optional
+from typing import Dict, Generator, List, Optional
 
-import dateparser
+from googleapiclient.errors import HttpError
 
+from churchtools.metrics import REGISTRY
 from nextcloud import NextCloud
 
-from .auth import spreadsheet_service
+from .auth import authorized_http, spreadsheet_service
+from .dates import parse_date
 
-SPREADSHEET_ID = os.environ["SPREADSHEET_ID"]
 SPREADSHEET_NAME = "GD Plan JK"
-NEXTCLOUD_BASE_URL = os.environ["NEXTCLOUD_BASE_URL"]
-NEXTCLOUD_TOKEN = os.environ["NEXTCLOUD_TOKEN"]
-NEXTCLOUD_USER = os.environ["NEXTCLOUD_USER"]
+
+# row of the column headers of the plan
+HEADER_ROW = 2
+# gallop offsets (1, 2, 4, ...) probed with one request when searching rows
+GALLOP_PROBES = 12
+
+# number of rows read with one request when iterating over a sheet
+ROWS_CHUNK_SIZE = 50
+
+# properties (id, title and number of rows) of the sheets per spreadsheet id,
+# shared by all GoogleSheet instances; only these fields are requested
+SHEET_PROPERTIES_FIELDS = "sheets.properties(sheetId,title,gridProperties.rowCount)"
+_sheet_properties: Dict[str, List[Dict]] = {}
+_sheet_properties_lock = threading.Lock()
+
+# connections of the read-ahead threads
+_local = threading.local()
+# the read-ahead threads live as long as the process, so that their
+# connections are reused by all iterations over rows
+_read_ahead_executor: Optional[ThreadPoolExecutor] = None
+_read_ahead_lock = threading.Lock()
+
+
+def _thread_http():
+    http = getattr(_local, "http", None)
+    if http is None:
+        http = _local.http = authorized_http()
+    return http
+
+
+def _read_ahead(fn, *args) -> Future:
+    global _read_ahead_executor
+    with _read_ahead_lock:
+        if _read_ahead_executor is None:
+            _read_ahead_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="sheets-read-ahead"
+            )
+        return _read_ahead_executor.submit(fn, *args)
+
+
+def _is_empty(row: List[str]) -> bool:
+    return not any(str(value).strip() for value in row)
 
 
 class GoogleSheet:
     def __init__(self, spreadsheet_id, table_name, last_column="Q"):
-        self._sheets = spreadsheet_service.spreadsheets()
+        self._sheets = spreadsheet_service().spreadsheets()
         self._values = self._sheets.values()
         self._spreadsheet_id = spreadsheet_id
         self._table_name = table_name
         self._sheet_id = None
-        spreadsheet = self._sheets.get(spreadsheetId=self._spreadsheet_id).execute()
-        for sheet in spreadsheet["sheets"]:
-            if sheet["properties"]["title"] == self._table_name:
-                self._sheet_id = sheet["properties"]["sheetId"]
+        for properties in self._get_sheet_properties():
+            if properties["title"] == self._table_name:
+                self._sheet_id = properties["sheetId"]
+                self._properties = properties
                 break
         else:
             raise ValueError(
@@ -34,111 +77,283 @@ class GoogleSheet:
             )
         self._last_column = last_column
 
-    def get(self):
-        return self._sheets.get(spreadsheetId=self._spreadsheet_id).execute()
+    @staticmethod
+    def _execute(endpoint: str, request, http=None):
+        """Execute a Sheets API request and record its metrics.
+
+        Requests which fail without an HTTP status are counted with status
+        ``error``."""
+        start = time.monotonic()
+        status = 200
+        sizes = []
+        postproc = request.postproc
+
+        def count_bytes(response, content):
+            sizes.append(len(content))
+            return postproc(response, content)
+
+        request.postproc = count_bytes
+        try:
+            return request.execute(http=http)
+        except HttpError as e:
+            status = e.resp.status
+            sizes.append(len(e.content or b""))
+            raise
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            REGISTRY.observe(
+                "sheets",
+                request.method,
+                endpoint,
+                status,
+                time.monotonic() - start,
+                sum(sizes) if sizes else None,
+            )
+
+    def get(self, fields: str = None):
+        """Return the spreadsheet metadata, only ``fields`` if given.
+
+        ``fields`` is a field mask like ``"sheets.properties(sheetId,title)"``."""
+        return self._execute(
+            "spreadsheets.get",
+            self._sheets.get(spreadsheetId=self._spreadsheet_id, fields=fields),
+        )
+
+    def _get_sheet_properties(self) -> List[Dict]:
+        with _sheet_properties_lock:
+            if self._spreadsheet_id not in _sheet_properties:
+                spreadsheet = self.get(fields=SHEET_PROPERTIES_FIELDS)
+                _sheet_properties[self._spreadsheet_id] = [
+                    sheet["properties"] for sheet in spreadsheet["sheets"]
+                ]
+            return _sheet_properties[self._spreadsheet_id]
+
+    @property
+    def row_count(self) -> int:
+        """Number of rows of the sheet's grid; ranges beyond it cannot be read."""
+        return self._properties["gridProperties"]["rowCount"]
 
-    def get_rows_values(self, n_rows=30, skip_rows=0):
+    def get_rows_values(self, n_rows=30, skip_rows=0, http=None):
+        """Return the values of the rows; empty rows at the end are left out."""
         row_range = f"{self._table_name}!A{skip_rows + 1}:{self._last_column}{skip_rows + n_rows}"
-        return self._values.get(
-            spreadsheetId=self._spreadsheet_id,
-            range=row_range,
-            dateTimeRenderOption="FORMATTED_STRING",
-            valueRenderOption="FORMATTED_VALUE",
-        ).execute()["values"]
+        return self._execute(
+            "values.get",
+            self._values.get(
+                spreadsheetId=self._spreadsheet_id,
+                range=row_range,
+                dateTimeRenderOption="FORMATTED_STRING",
+                valueRenderOption="FORMATTED_VALUE",
+            ),
+            http=http,
+        ).get("values", [])
+
+    def batch_get(self, ranges: List[str]) -> List[List[List[str]]]:
+        """Return the values of several ranges, read with one request.
+
+        Ranges without a sheet name (e.g. ``"A2:Q2"``) refer to this sheet,
+        others (e.g. ``"Archiv!A1:Q1"``) may refer to any sheet of the
+        spreadsheet."""
+        ranges = [r if "!" in r else f"{self._table_name}!{r}" for r in ranges]
+        result = self._execute(
+            "values.batchGet",
+            self._values.batchGet(
+                spreadsheetId=self._spreadsheet_id,
+                ranges=ranges,
+                dateTimeRenderOption="FORMATTED_STRING",
+                valueRenderOption="FORMATTED_VALUE",
+            ),
+        )
+        return [value_range.get("values", []) for value_range in result["valueRanges"]]
+
+    def row_range(self, starting_row: int, n_rows: int = 1) -> str:
+        return f"A{starting_row}:{self._last_column}{starting_row + n_rows - 1}"
+
+    def iter_rows_values(
+        self, starting_row=1, chunk_size=ROWS_CHUNK_SIZE, first_chunk=None
+    ):
+        """Yield the values of all rows from ``starting_row`` to the first empty one.
+
+        The rows are read ``chunk_size`` at a time; the next chunk is already
+        requested by a background thread while the current one is consumed.
+        ``first_chunk`` are the values of the first chunk if already read."""
+        assert starting_row >= 1
+
+        def read(skip_rows):
+            return self.get_rows_values(chunk_size, skip_rows, http=_thread_http())
+
+        skip_rows = starting_row - 1
+        if first_chunk is not None:
+            next_chunk = Future()
+            next_chunk.set_result(first_chunk)
+        else:
+            next_chunk = _read_ahead(read, skip_rows)
+        try:
+            while next_chunk is not None:
+                rows = next_chunk.result()
+                skip_rows += chunk_size
+                # a short chunk means the end of the sheet was reached
+                next_chunk = None
+                if len(rows) == chunk_size:
+                    next_chunk = _read_ahead(read, skip_rows)
+                for row in rows:
+                    if _is_empty(row):
+                        return
+                    yield row
+        finally:
+            # the rows are not needed any more if the caller stopped early
+            if next_chunk is not None:
+                next_chunk.cancel()
 
     def insert_row(self, row, before_row: int = 1):
-        result = self._sheets.batchUpdate(
-            spreadsheetId=self._spreadsheet_id,
-            body={
-                "requests": [
-                    {
-                        "insertDimension": {
-                            "range": {
-                                "sheetId": self._sheet_id,
-                                "dimension": "ROWS",
-                                "startIndex": before_row - 1,
-                                "endIndex": before_row,
+        result = self._execute(
+            "spreadsheets.batchUpdate",
+            self._sheets.batchUpdate(
+                spreadsheetId=self._spreadsheet_id,
+                body={
+                    "requests": [
+                        {
+                            "insertDimension": {
+                                "range": {
+                                    "sheetId": self._sheet_id,
+                                    "dimension": "ROWS",
+                                    "startIndex": before_row - 1,
+                                    "endIndex": before_row,
+                                }
                             }
                         }
-                    }
-                ]
-            },
-        ).execute()
-        result = self._values.append(
-            spreadsheetId=self._spreadsheet_id,
-            range=self._table_name + "!A" + str(before_row),
-            valueInputOption="USER_ENTERED",
-            body={"values": [row]},
-        ).execute()
+                    ]
+                },
+            ),
+        )
+        result = self._execute(
+            "values.append",
+            self._values.append(
+                spreadsheetId=self._spreadsheet_id,
+                range=self._table_name + "!A" + str(before_row),
+                valueInputOption="USER_ENTERED",
+                body={"values": [row]},
+            ),
+        )
+        self._properties["gridProperties"]["rowCount"] += 1
         return result.get("updates").get("updatedRows") == 1
 
     def delete_row(self, row_index: int):
-        self._sheets.batchUpdate(
-            spreadsheetId=self._spreadsheet_id,
-            body={
-                "requests": [
-                    {
-                        "deleteDimension": {
-                            "range": {
-                                "sheetId": self._sheet_id,
-                                "dimension": "ROWS",
-                                "startIndex": row_index - 1,
-                                "endIndex": row_index,
+        self._execute(
+            "spreadsheets.batchUpdate",
+            self._sheets.batchUpdate(
+                spreadsheetId=self._spreadsheet_id,
+                body={
+                    "requests": [
+                        {
+                            "deleteDimension": {
+                                "range": {
+                                    "sheetId": self._sheet_id,
+                                    "dimension": "ROWS",
+                                    "startIndex": row_index - 1,
+                                    "endIndex": row_index,
+                                }
                             }
                         }
-                    }
-                ]
-            },
-        ).execute()
+                    ]
+                },
+            ),
+        )
+        self._properties["gridProperties"]["rowCount"] -= 1
 
 
 class Gottesdienstplan:
     def __init__(self):
-        self._sheet = GoogleSheet(SPREADSHEET_ID, SPREADSHEET_NAME)
+        self._sheet = GoogleSheet(os.environ["SPREADSHEET_ID"], SPREADSHEET_NAME)
         self._headers = None
 
+    def _set_headers(self, rows: List[List[str]]):
+        self._headers = [h.strip() for h in rows[0]]
+
     def get_headers(self):
         if self._headers is None:
-            self._headers = [
-                h.strip() for h in self._sheet.get_rows_values(1, skip_rows=1)[0]
-            ]
+            self._set_headers(self._sheet.get_rows_values(1, skip_rows=HEADER_ROW - 1))
         return self._headers
 
-    def iter_rows(self, starting_row=3) -> Generator[List[str], None, None]:
-        assert starting_row >= 1
-        i = starting_row - 1
-        while True:
-            yield self._sheet.get_rows_values(1, skip_rows=i)[0]
-            i = i + 1
-
-    def iter_row_data(self, starting_row=3):
-        headers = self.get_headers()
-        for values in self.iter_rows(starting_row=starting_row):
-            try:
-                date = dateparser.parse(
-                    values[0], settings={"TIMEZONE": "CET"}, languages=["de"]
-                )
-                if date is None:
-                    raise ValueError(f"Invalid 'Datum': {values[0]}")
-                values[0] = date
-            except ValueError:
-                raise ValueError(f"Invalid 'Datum': {values[0]}")
+    def iter_rows(
+        self, starting_row=3, chunk_size=ROWS_CHUNK_SIZE
+    ) -> Generator[List[str], None, None]:
+        """Yield the rows of the plan, up to the first empty row."""
+        yield from self._sheet.iter_rows_values(starting_row, chunk_size)
+
+    def iter_row_data(self, starting_row=3, chunk_size=ROWS_CHUNK_SIZE):
+        first_chunk = None
+        if self._headers is None:
+            # read the headers together with the first rows
+            header_rows, first_chunk = self._sheet.batch_get(
+                [
+                    self._sheet.row_range(HEADER_ROW),
+                    self._sheet.row_range(starting_row, chunk_size),
+                ]
+            )
+            self._set_headers(header_rows)
+        headers = self._headers
+        for values in self._sheet.iter_rows_values(
+            starting_row, chunk_size, first_chunk=first_chunk
+        ):
+            values[0] = parse_date(values[0])
             yield dict(zip_longest(headers, values, fillvalue=None))
 
+    def find_first_future_row(self, starting_row=3, now=None) -> int:
+        """Return the number of the first row with a date after ``now``.
+
+        The plan is sorted by date, so instead of reading all past rows the
+        row is searched for: the rows ``starting_row`` + 0, 1, 3, 7, 15, ...
+        are probed with one request until a future (or empty) row is found,
+        then the row is bisected in the last interval with single row reads.
+        Probes beyond the sheet's grid are left out, its end ends the plan.
+        Like :meth:`iter_row_data`, this expects a date in every row up to
+        the first empty row, which ends the plan."""
+        if now is None:
+            now = datetime.datetime.today()
+
+        def is_future(values: List[List[str]]) -> bool:
+            # only an empty row is the end of the plan, not an empty date
+            if not values or _is_empty(values[0]):
+                return True
+            return parse_date(values[0][0]) > now
+
+        last_row = self._sheet.row_count
+        past = None
+        future = None
+        base = starting_row
+        while future is None:
+            rows = [base + 2**k - 1 for k in range(GALLOP_PROBES)]
+            rows = [row for row in rows if row <= last_row]
+            probes = (
+                self._sheet.batch_get([self._sheet.row_range(row) for row in rows])
+                if rows
+                else []
+            )
+            for row, values in zip(rows, probes):
+                if is_future(values):
+                    future = row
+                    break
+                past = row
+            else:
+                if len(rows) < GALLOP_PROBES:
+                    future = max(base, last_row + 1)
+                else:
+                    base = past + 1
+        if past is None:
+            return future
+        while future - past > 1:
+            middle = (past + future) // 2
+            if is_future(self._sheet.get_rows_values(1, skip_rows=middle - 1)):
+                future = middle
+            else:
+                past = middle
+        return future
+
     def iter_future_events(self):
         """Get the next rows/events that lie in the future."""
-        in_future = False
-        for row_data in self.iter_row_data(starting_row=3):
-            if in_future:
-                yield row_data
-            else:
-                try:
-                    if row_data["Datum"] > datetime.datetime.today():
-                        in_future = True
-                        yield row_data
-                except KeyError:
-                    print(f"Could not parse date for {row_data}")
-                    raise
+        yield from self.iter_row_data(starting_row=self.find_first_future_row())
 
     def iter_next_future_events(self, *, num: int = None, span: str = None):
         if num is not None:
@@ -304,9 +519,10 @@ class GoDiPlanChecker:
     def check_for_nextcloud_folder_and_ablauf(self, event, report=None):
         if report is None:
             report = print
+        base_url = os.environ["NEXTCLOUD_BASE_URL"]
         nc = NextCloud(
-            webdav_url=f"{NEXTCLOUD_BASE_URL}/remote.php/dav/files/wulmer/",
-            webdav_auth=(NEXTCLOUD_USER, NEXTCLOUD_TOKEN),
+            webdav_url=f"{base_url}/remote.php/dav/files/wulmer/",
+            webdav_auth=(os.environ["NEXTCLOUD_USER"], os.environ["NEXTCLOUD_TOKEN"]),
         )
         base_folder = "Gottesdienste/"
         event_datum = event["Datum"].strftime("%Y-%m-%d")
@@ -1,11 +1,39 @@
+import re
+import time
 from pathlib import Path
 
+import httpx
 from webdav4.fsspec import WebdavFileSystem
 
+from churchtools.metrics import REGISTRY, normalize_endpoint
+
+# file names would make every request its own endpoint
+_FILE_PATH = re.compile(r"(/files/[^/]+)/.*")
+
+
+def _start_timer(request: httpx.Request):
+    request.extensions["metrics_start"] = time.monotonic()
+
+
+def _record_metrics(response: httpx.Response):
+    request = response.request
+    REGISTRY.observe(
+        "nextcloud",
+        request.method,
+        _FILE_PATH.sub(r"\1/{path}", normalize_endpoint(request.url.path)),
+        response.status_code,
+        time.monotonic() - request.extensions["metrics_start"],
+        int(response.headers.get("Content-Length", 0)),
+    )
+
 
 class NextCloud:
     def __init__(self, webdav_url: str, webdav_auth):
-        self._fs = WebdavFileSystem(webdav_url, auth=webdav_auth)
+        self._fs = WebdavFileSystem(
+            webdav_url,
+            auth=webdav_auth,
+            event_hooks={"request": [_start_timer], "response": [_record_metrics]},
+        )
 
     def ls(self, path: str = "/", detail: bool = False):
         return self._fs.ls(path, detail=detail)
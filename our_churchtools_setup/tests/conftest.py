@@ -7,10 +7,13 @@ import pytest
 import requests
 from pytest_bdd import given, parsers, then, when
 
-from churchtools import ChurchToolsApi
+from churchtools import ChurchToolsApi, ChurchToolsSnapshot
 
 GROUP_ID_ALLE_MITARBEITER = 172
 
+# reuse a snapshot of persons, groups and memberships taken by an earlier run
+SNAPSHOT_MAX_AGE = 10 * 60
+
 
 # Fixtures for scenarios tests
 @pytest.fixture
@@ -23,6 +26,13 @@ def api():
     return ChurchToolsApi(os.environ["API_BASE_URL"], os.environ["ADMIN_TOKEN"])
 
 
+@pytest.fixture(scope="session")
+def snapshot(request):
+    api = ChurchToolsApi(os.environ["API_BASE_URL"], os.environ["ADMIN_TOKEN"])
+    path = request.config.cache.mkdir("ct") / "snapshot.json"
+    return ChurchToolsSnapshot.load_cached(api, path, max_age=SNAPSHOT_MAX_AGE)
+
+
 @pytest.fixture
 def make_user_api(api: ChurchToolsApi):
     def wrapped_function(user_id: int):
@@ -46,15 +56,15 @@ def all_groups_of_a_type(api: ChurchToolsApi, group_type: str):
 
 
 @given("a user who is not member of any group", target_fixture="user")
-def no_group_user(api: ChurchToolsApi, request):
-    all_users = api.get_persons()
+def no_group_user(snapshot: ChurchToolsSnapshot, request):
+    all_users = snapshot.persons
     user_id = request.config.cache.get("ct/user/not-member-of-any-group", None)
-    if user_id is not None:
-        potential_users = chain([api.get_person(user_id)], all_users)
+    if user_id in snapshot.persons_by_id:
+        potential_users = chain([snapshot.persons_by_id[user_id]], all_users)
     else:
         potential_users = all_users
     for user in potential_users:
-        if len(api.get_memberships(user["id"])) == 0:
+        if len(snapshot.memberships(user["id"])) == 0:
             request.config.cache.set("ct/user/not-member-of-any-group", user["id"])
             return user
     raise RuntimeError("No user found who is in no group!")
@@ -65,17 +75,11 @@ def no_group_user(api: ChurchToolsApi, request):
     target_fixture="search_result",
 )
 def all_users_who_are_role_of_a_group(
-    api: ChurchToolsApi, group_role, group_type
+    api: ChurchToolsApi, snapshot: ChurchToolsSnapshot, group_role, group_type
 ) -> Set[int]:
     group_type_id = api.get_id_of_group_type(group_type)
     role_id = api.get_id_of_group_role(group_type_id, group_role)
-    groups = api.get_groups(group_type_ids=[group_type_id])
-    collected_persons = set()
-    for group in groups:
-        members = api.get_group_members(group["id"], role_ids=[role_id])
-        for member in members:
-            collected_persons.add(member["personId"])
-    return collected_persons
+    return snapshot.persons_with_role([role_id], active_only=True)
 
 
 @given(
@@ -84,17 +88,18 @@ def all_users_who_are_role_of_a_group(
 )
 def a_user_who_is_only_member_of_one_group_type(
     api: ChurchToolsApi,
+    snapshot: ChurchToolsSnapshot,
     group_role,
     group_type,
     request,
     group_context,
 ):
-    all_users = api.get_persons()
+    all_users = snapshot.persons
     user_id = request.config.cache.get(
         f"ct/user/member-{group_role}-of-group-{group_type}", None
     )
-    if user_id is not None:
-        potential_users = chain([api.get_person(user_id)], all_users)
+    if user_id in snapshot.persons_by_id:
+        potential_users = chain([snapshot.persons_by_id[user_id]], all_users)
     else:
         potential_users = all_users
     required_group_type_id = api.get_id_of_group_type(group_type)
@@ -102,15 +107,12 @@ def a_user_who_is_only_member_of_one_group_type(
         required_group_type_id, group_role
     )
     for user in potential_users:
-        for membership in api.get_memberships(user["id"]):
-            assert membership["group"]["domainType"] == "group"
-            group_id = int(membership["group"]["domainIdentifier"])
+        for group_id, role_id in snapshot.memberships(user["id"], active_only=True):
             if group_id == GROUP_ID_ALLE_MITARBEITER:
                 continue  # don't count alle mitarbeiter merkmal
-            role_id = int(membership["groupTypeRoleId"])
             if role_id != required_group_role_id:
                 continue
-            group = api.get_group(id=membership["group"]["domainIdentifier"])
+            group = snapshot.groups_by_id[group_id]
             group_type_id = int(group["information"]["groupTypeId"])
             if group_type_id == required_group_type_id:
                 request.config.cache.set(
@@ -3,4 +3,7 @@ from setuptools import find_packages, setup
 setup(
     name="churchtools_automation",
     packages=find_packages(),
+    entry_points={
+        "console_scripts": ["ct-cache=churchtools.httpcache:main"],
+    },
 )
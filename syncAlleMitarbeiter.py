@@ -1,30 +1,43 @@
+import argparse
 import os
+import sys
 
-from churchtools import ChurchToolsApi
+from churchtools import ChurchToolsApi, HttpCache
+from churchtools.autogroups import AutoGroups, MemberStatus
+from churchtools.metrics import dump_at_exit_from_environ
 
-if __name__ == "__main__":
-    ct = ChurchToolsApi(os.environ["API_BASE_URL"], os.environ["ADMIN_TOKEN"])
-
-    all_members_group_id = list(ct.get_groups(query="Auto-Gruppe: Alle Mitarbeiter"))[
-        0
-    ]["id"]
-
-    member_status_ids = [s["id"] for s in ct.get_statuses() if s["isMember"]]
-
-    member_persons = ct.get_persons(status_ids=member_status_ids)
-    member_person_ids = {p["id"] for p in member_persons}
+# the members of each auto-group, see churchtools.autogroups for the rules
+AUTO_GROUPS = {
+    "Auto-Gruppe: Alle Mitarbeiter": MemberStatus(),
+}
 
-    existing_group_members = ct.get_group_members(group_id=all_members_group_id)
-    existing_group_member_ids = {p["personId"] for p in existing_group_members}
-
-    to_add = member_person_ids - existing_group_member_ids
-    to_remove = existing_group_member_ids - member_person_ids
-
-    if not to_add and not to_remove:
+if __name__ == "__main__":
+    dump_at_exit_from_environ("syncAlleMitarbeiter")
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Do not change anything, just print what would be done",
+    )
+    args = arg_parser.parse_args()
+    if args.dry_run:
+        print("==== DRY RUN ====")
+
+    ct = ChurchToolsApi(
+        os.environ["API_BASE_URL"],
+        os.environ["ADMIN_TOKEN"],
+        cache=HttpCache.from_environ(),
+        max_workers=4,
+    )
+
+    changes = AutoGroups(AUTO_GROUPS).plan(ct)
+
+    if not changes:
         print("Nothing to do today :-)")
-    for p in to_add:
-        print(f"Adding #{p}")
-        ct.add_to_group(who=p, to=all_members_group_id)
-    for p in to_remove:
-        print(f"Removing #{p}")
-        ct.remove_from_group(who=p, from_=all_members_group_id)
+    else:
+        print(changes.describe())
+    if changes and not args.dry_run:
+        result = changes.apply(ct)
+        print(result.summary())
+        if not result:
+            sys.exit(1)
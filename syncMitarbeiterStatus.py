@@ -1,7 +1,17 @@
 import argparse
 import os
+import sys
 
-from churchtools import ChurchToolsApi
+from churchtools import (
+    ChangeSet,
+    ChurchToolsApi,
+    GroupMemberStore,
+    HttpCache,
+    PersonStore,
+)
+from churchtools.autogroups import PersonIndex, roles
+from churchtools.metrics import dump_at_exit_from_environ
+from churchtools.reconcile import IdSet, diff
 
 # the following list defines all roles for groups which should
 # be treated as 'Mitarbeiter'
@@ -12,6 +22,7 @@ MITARBEITER_GROUP_ROLES = {
     "Orga-Gruppe": {"Leiter"},
     "Veranstaltung": {"Organisator"},
 }
+MITARBEITER_RULE = roles(MITARBEITER_GROUP_ROLES)
 
 PROTECTED_STATUS = "Mitarbeiter (HA)"
 
@@ -20,42 +31,72 @@ DEFAULT_MITARBEITER_STATUS = "Mitarbeiter (EA)"
 EX_MITARBEITER_STATUS = "Ehemalige MA"
 
 if __name__ == "__main__":
+    dump_at_exit_from_environ("syncMitarbeiterStatus")
     arg_parser = argparse.ArgumentParser()
     arg_parser.add_argument(
         "--dry-run",
         action="store_true",
         help="Do not change anything, just print what would be done",
     )
+    arg_parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="Download all persons and group members even if local stores are "
+        "configured",
+    )
     args = arg_parser.parse_args()
     if args.dry_run:
         print("==== DRY RUN ====")
 
-    api = ChurchToolsApi(os.environ["API_BASE_URL"], os.environ["ADMIN_TOKEN"])
-    status_ids = api.get_status_ids()
+    cache = HttpCache.from_environ()
+    api = ChurchToolsApi(
+        os.environ["API_BASE_URL"],
+        os.environ["ADMIN_TOKEN"],
+        cache=cache,
+        max_workers=4,
+    )
+    masterdata = api.masterdata
+    status_ids = masterdata.status_ids
 
-    members_from_roles = set()
-    for group_type in MITARBEITER_GROUP_ROLES:
-        group_type_id = api.get_id_of_group_type(group_type)
-        role_ids = [
-            api.get_id_of_group_role(group_type_id, group_role)
-            for group_role in MITARBEITER_GROUP_ROLES[group_type]
-        ]
-        active_groups = api.get_groups(group_type_ids=[group_type_id])
-        for group in active_groups:
-            members = api.get_group_members(group["id"], role_ids=role_ids)
-            for member in members:
-                members_from_roles.add(member["personId"])
+    member_store = GroupMemberStore.from_environ()
+    if member_store is not None and args.full_refresh:
+        member_store.clear()
+    members_from_roles = MITARBEITER_RULE.evaluate(
+        PersonIndex.load(api, [MITARBEITER_RULE], member_store=member_store)
+    )
 
     systemuser_status_id = status_ids["Systembenutzer"]
+    # persons with these statuses are never downgraded
+    exempt_status_ids = {systemuser_status_id, status_ids[PROTECTED_STATUS]}
 
-    members_from_status = set()
-    member_status_ids = [s["id"] for s in api.get_statuses() if s["isMember"]]
-    for person in api.get_persons(status_ids=member_status_ids):
-        members_from_status.add(person["id"])
+    person_store = PersonStore.from_environ()
+    if person_store is not None:
+        person_store.refresh(api, full=args.full_refresh)
+        members_from_status = person_store.ids_with_status(masterdata.member_status_ids)
+        exempt = person_store.ids_with_status(exempt_status_ids)
+    else:
+        persons = list(api.get_persons(status_ids=masterdata.member_status_ids))
+        members_from_status = IdSet(person["id"] for person in persons)
+        exempt = IdSet(
+            person["id"]
+            for person in persons
+            if person["statusId"] in exempt_status_ids
+        )
 
-    should_have_member_status = members_from_roles - members_from_status
-    should_not_have_member_status = members_from_status - members_from_roles
+    status_diff = diff(members_from_roles, members_from_status)
+    if member_store is not None and status_diff.remove - exempt:
+        # the store can miss role changes, confirm downgrades with fresh data
+        member_store.clear()
+        if cache is not None:
+            cache.invalidate("/groups*")
+        members_from_roles = MITARBEITER_RULE.evaluate(
+            PersonIndex.load(api, [MITARBEITER_RULE], member_store=member_store)
+        )
+        status_diff = diff(members_from_roles, members_from_status)
+    should_have_member_status = status_diff.add
+    should_not_have_member_status = status_diff.remove
 
+    changes = ChangeSet()
     if not should_have_member_status and not should_not_have_member_status:
         print("Nothing to do today :-)")
     if should_have_member_status:
@@ -64,12 +105,19 @@ if __name__ == "__main__":
             print(
                 f"- #{p}\t{os.environ['CT_BASE_URL']}?q=churchdb#/PersonView/searchEntry:%23{p}/"
             )
-            if not args.dry_run:
-                api.set_person_status(p, status_ids[DEFAULT_MITARBEITER_STATUS])
+            changes.set_person_status(
+                p,
+                status_ids[DEFAULT_MITARBEITER_STATUS],
+                label=DEFAULT_MITARBEITER_STATUS,
+            )
     if should_not_have_member_status:
         print(f"Downgrading persons from members to '{EX_MITARBEITER_STATUS}':")
+        persons = api.get_persons_by_ids(should_not_have_member_status)
         for p in should_not_have_member_status:
-            person_info = api.get_person(p)
+            person_info = persons.get(p)
+            if person_info is None:
+                print(f"- WARNING: person #{p} not found or not accessible, skipped")
+                continue
             if person_info["statusId"] == systemuser_status_id:
                 # ignore system users
                 continue
@@ -79,5 +127,12 @@ if __name__ == "__main__":
             print(
                 f"- #{p}\t{os.environ['CT_BASE_URL']}?q=churchdb#/PersonView/searchEntry:%23{p}/"
             )
-            if not args.dry_run:
-                api.set_person_status(p, status_ids[EX_MITARBEITER_STATUS])
+            changes.set_person_status(
+                p, status_ids[EX_MITARBEITER_STATUS], label=EX_MITARBEITER_STATUS
+            )
+
+    if changes and not args.dry_run:
+        result = changes.apply(api)
+        print(result.summary())
+        if not result:
+            sys.exit(1)
@@ -4,10 +4,12 @@ import subprocess
 import sys
 from pathlib import Path
 
-from churchtools import ChurchToolsApi
+from churchtools import ChurchToolsApi, HttpCache
+from churchtools.metrics import dump_at_exit_from_environ
 from postfix_sync import Mapping, PostMap
 
 if __name__ == "__main__":
+    dump_at_exit_from_environ("syncPostfixAliases")
     postfix_db = Path("/etc/postfix/virtual")
     if not postfix_db.exists():
         print(
@@ -23,7 +25,12 @@ if __name__ == "__main__":
     postmap = PostMap(postfix_db)
     mappings = Mapping.fromfile(postfix_db)
 
-    ct = ChurchToolsApi(os.environ["API_BASE_URL"], os.environ["ADMIN_TOKEN"])
+    ct = ChurchToolsApi(
+        os.environ["API_BASE_URL"],
+        os.environ["ADMIN_TOKEN"],
+        cache=HttpCache.from_environ(),
+        max_workers=4,
+    )
     groups_to_sync = [
         ("Technik-Team", "technik-list@johanneskirche-rutesheim.de"),
         ("Technik-Team", "technik-list@rutesheim-evangelisch.de"),
@@ -41,24 +48,42 @@ if __name__ == "__main__":
         ("Welcome-Team", "welcometeam-list@rutesheim-evangelisch.de"),
     ]
 
-    has_updates = False
-    for group_ctname, alias in groups_to_sync:
+    # several aliases share the same group, so each group, its members and
+    # their tags and emails are only fetched once
+    def get_active_members(group_ctname):
         try:
             ctgroup = list(ct.get_groups(query=group_ctname))[0]
         except IndexError:
             print(f"ERROR: No group {group_ctname} found!")
             raise
-        members = ct.get_group_members(group_id=ctgroup["id"])
+        return [
+            m
+            for m in ct.get_group_members(group_id=ctgroup["id"])
+            if m["groupMemberStatus"] == "active"
+        ]
+
+    group_names = sorted({group_ctname for group_ctname, _ in groups_to_sync})
+    group_members = dict(
+        zip(group_names, ct.map_concurrent(get_active_members, group_names))
+    )
+    person_ids = {m["personId"] for ms in group_members.values() for m in ms}
+    # only the persons with this tag are listed, not those of every tag
+    ignored_person_ids = {
+        person_id
+        for person_id, tags in ct.get_tags_for_persons(
+            person_ids, names=["postfix:ignore"]
+        ).items()
+        if tags
+    }
+    default_emails = ct.get_default_emails(person_ids)
+
+    has_updates = False
+    for group_ctname, alias in groups_to_sync:
         recipients = []
-        for m in members:
-            if "postfix:ignore" in ct.get_tags_for_person(m["personId"]):
-                continue
-            if not m["groupMemberStatus"] == "active":
+        for m in group_members[group_ctname]:
+            if m["personId"] in ignored_person_ids:
                 continue
-            try:
-                default_email = ct.get_default_email_for_person(m["personId"])
-            except ValueError:
-                default_email = None
+            default_email = default_emails.get(m["personId"])
             if not default_email:
                 print(
                     f"WARNING: User #{m['personId']} has no default email "
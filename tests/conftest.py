@@ -0,0 +1,125 @@
+import json
+import re
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import pytest
+import requests
+
+from churchtools import ChurchToolsApi
+
+BASE_URL = "https://ct.test/api"
+
+
+class FakeChurchTools:
+    """Minimal in-process stand-in for the ChurchTools REST API.
+
+    Handlers are registered per method and path regex and receive the
+    request path and the parsed query parameters. They return the JSON body
+    and optionally a status code and headers."""
+
+    def __init__(self):
+        self._routes = []
+        self._lock = threading.Lock()
+        self.requests = []
+
+    def route(self, method: str, pattern: str, handler):
+        # later routes take precedence
+        self._routes.insert(0, (method.upper(), re.compile(pattern + "$"), handler))
+
+    def paged(self, pattern: str, items, page_size: int = 2, select=None):
+        """Serve ``items`` in pages; ``select(item, params)`` filters them.
+
+        Returns the handler, so that tests can wrap it."""
+
+        def handler(path, params):
+            selected = items
+            if select is not None:
+                selected = [item for item in items if select(item, params)]
+            limit = int(params.get("limit", [page_size])[0])
+            page = int(params.get("page", ["1"])[0])
+            last_page = max(1, -(-len(selected) // limit))
+            return {
+                "data": selected[(page - 1) * limit : page * limit],
+                "meta": {
+                    "count": len(selected),
+                    "pagination": {
+                        "total": len(selected),
+                        "limit": limit,
+                        "current": page,
+                        "lastPage": last_page,
+                    },
+                },
+            }
+
+        self.route("GET", pattern, handler)
+        return handler
+
+    def count(self, method: str, pattern: str) -> int:
+        regex = re.compile(pattern + "$")
+        return sum(1 for m, p, _ in self.requests if m == method and regex.match(p))
+
+    def handle(self, method: str, url: str):
+        url = urlsplit(url)
+        path = url.path[len(urlsplit(BASE_URL).path) :]
+        params = parse_qs(url.query)
+        with self._lock:
+            self.requests.append((method, path, params))
+        for route_method, pattern, handler in self._routes:
+            if route_method == method and pattern.match(path):
+                result = handler(path, params)
+                break
+        else:
+            result = ({"message": "not found"}, 404)
+        if not isinstance(result, tuple):
+            result = (result,)
+        body, status, headers = result[0], 200, {}
+        if len(result) > 1:
+            status = result[1]
+        if len(result) > 2:
+            headers = result[2]
+        headers = {"Content-Type": "application/json", **headers}
+        return status, headers, json.dumps(body).encode()
+
+    def send(self, request: requests.PreparedRequest) -> requests.Response:
+        status, headers, content = self.handle(request.method, request.url)
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update(headers)
+        response._content = content
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        return response
+
+    def async_transport(self) -> httpx.MockTransport:
+        def handler(request: httpx.Request) -> httpx.Response:
+            status, headers, content = self.handle(request.method, str(request.url))
+            return httpx.Response(status, headers=headers, content=content)
+
+        return httpx.MockTransport(handler)
+
+
+@pytest.fixture
+def ct_server(monkeypatch):
+    server = FakeChurchTools()
+    monkeypatch.setattr(
+        requests.adapters.HTTPAdapter,
+        "send",
+        lambda adapter, request, **kwargs: server.send(request),
+    )
+    return server
+
+
+@pytest.fixture
+def make_api(ct_server):
+    def wrapped_function(**kwargs):
+        return ChurchToolsApi(BASE_URL, "secret", **kwargs)
+
+    return wrapped_function
+
+
+@pytest.fixture
+def api(make_api):
+    return make_api()
@@ -0,0 +1,82 @@
+import asyncio
+
+import httpx
+import pytest
+
+from churchtools.aio import AsyncChurchToolsApi
+
+
+def run(api_factory, coro_fn):
+    async def main():
+        async with api_factory() as api:
+            return await coro_fn(api)
+
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def make_async_api(ct_server):
+    def wrapped_function(**kwargs):
+        return AsyncChurchToolsApi(
+            "https://ct.test/api",
+            "secret",
+            transport=ct_server.async_transport(),
+            **kwargs,
+        )
+
+    return wrapped_function
+
+
+def test_paginate_yields_all_pages_in_order(make_async_api, ct_server):
+    persons = [{"id": i} for i in range(1, 12)]
+    ct_server.paged("/persons", persons, page_size=2)
+
+    async def collect(api):
+        return [p["id"] async for p in api.get_persons()]
+
+    assert run(make_async_api, collect) == list(range(1, 12))
+    assert ct_server.count("GET", "/persons") == 6
+
+
+def test_fan_out(make_async_api, ct_server):
+    ct_server.route("GET", r"/persons/\d+", lambda p, q: {"data": {"path": p}})
+
+    async def fan_out(api):
+        return await asyncio.gather(*(api.get_person(i) for i in range(50)))
+
+    persons = run(lambda: make_async_api(max_per_host=3), fan_out)
+    assert [p["path"] for p in persons] == [f"/persons/{i}" for i in range(50)]
+
+
+def test_errors_are_raised(make_async_api, ct_server):
+    async def set_status(api):
+        await api.set_person_status(1, 2)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        run(make_async_api, set_status)
+
+
+def test_max_per_host_bounds_requests_in_flight():
+    in_flight = peak = 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, json={"data": {}})
+
+    def make_api():
+        return AsyncChurchToolsApi(
+            "https://ct.test/api",
+            "secret",
+            max_per_host=3,
+            transport=httpx.MockTransport(handler),
+        )
+
+    async def fan_out(api):
+        return await asyncio.gather(*(api.get_person(i) for i in range(20)))
+
+    assert len(run(make_api, fan_out)) == 20
+    assert peak == 3
@@ -0,0 +1,144 @@
+import pytest
+
+from churchtools.autogroups import AutoGroups, MemberStatus, Role, Status, Tag, roles
+from churchtools.changeset import ADD_TO_GROUP, REMOVE_FROM_GROUP
+
+MASTERDATA = {
+    "groupTypes": [{"id": 1, "name": "Kleingruppe"}, {"id": 2, "name": "Dienst"}],
+    "roles": [
+        {"id": 10, "groupTypeId": 1, "name": "Leiter"},
+        {"id": 11, "groupTypeId": 2, "name": "Leiter"},
+        {"id": 12, "groupTypeId": 2, "name": "Mitarbeiter"},
+    ],
+}
+STATUSES = [
+    {"id": 1, "name": "Mitglied", "isMember": True},
+    {"id": 2, "name": "Freund", "isMember": False},
+]
+PERSONS = [{"id": i, "statusId": 1 if i <= 3 else 2} for i in range(1, 7)]
+GROUPS = [
+    {"id": 100, "name": "Hauskreis", "information": {"groupTypeId": 1}},
+    {"id": 200, "name": "Technik", "information": {"groupTypeId": 2}},
+    {"id": 900, "name": "Alle", "information": {"groupTypeId": 3}},
+    {"id": 901, "name": "Leiter", "information": {"groupTypeId": 3}},
+]
+TAGS = [{"id": 1, "name": "Chor"}, {"id": 2, "name": "Band"}]
+MEMBERS = [
+    {"personId": 1, "groupId": 100, "groupTypeRoleId": 10},
+    {"personId": 4, "groupId": 200, "groupTypeRoleId": 11},
+    {"personId": 5, "groupId": 200, "groupTypeRoleId": 12},
+    {"personId": 1, "groupId": 900, "groupTypeRoleId": 30},
+    {"personId": 6, "groupId": 900, "groupTypeRoleId": 30},
+]
+
+
+@pytest.fixture
+def ct_data(ct_server):
+    ct_server.route("GET", "/person/masterdata", lambda p, q: {"data": MASTERDATA})
+    ct_server.paged("/statuses", STATUSES)
+    ct_server.paged(
+        "/persons",
+        PERSONS,
+        page_size=100,
+        select=lambda p, q: str(p["statusId"]) in q["status_ids[]"],
+    )
+    ct_server.paged(
+        "/groups",
+        GROUPS,
+        select=lambda g, q: (
+            q["query"][0] in g["name"]
+            if "query" in q
+            else str(g["information"]["groupTypeId"]) in q["group_type_ids[]"]
+        ),
+    )
+
+    def members(path, params):
+        group_ids = {int(i) for i in params["group_ids[]"]}
+        role_ids = {int(i) for i in params.get("role_ids[]", [])}
+        return {
+            "data": [
+                m
+                for m in MEMBERS
+                if m["groupId"] in group_ids
+                and (not role_ids or m["groupTypeRoleId"] in role_ids)
+            ],
+            "meta": {},
+        }
+
+    ct_server.route("GET", "/groups/members", members)
+    ct_server.route("GET", "/tags", lambda p, q: {"data": TAGS})
+    ct_server.paged("/tags/1/persons", [{"id": 2}])
+    ct_server.paged("/tags/2/persons", [{"id": 3}, {"id": 5}])
+    return ct_server
+
+
+def plan(api, rules):
+    return sorted(
+        (c.action, c.person_id, c.target_id) for c in AutoGroups(rules).plan(api)
+    )
+
+
+def test_auto_groups(api, ct_data):
+    changes = plan(
+        api,
+        {
+            "Alle": MemberStatus(),
+            "Leiter": Role("Kleingruppe", "Leiter") | Role("Dienst", "Leiter"),
+        },
+    )
+
+    assert changes == [
+        (ADD_TO_GROUP, 1, 901),
+        (ADD_TO_GROUP, 2, 900),
+        (ADD_TO_GROUP, 3, 900),
+        (ADD_TO_GROUP, 4, 901),
+        (REMOVE_FROM_GROUP, 6, 900),
+    ]
+    # all rules share one download of persons and one of group members
+    assert ct_data.count("GET", "/persons") == 1
+    assert ct_data.count("GET", "/groups/members") == 2
+    # only the persons with a member status and the groups of the rules
+    persons_params = [q for _, p, q in ct_data.requests if p == "/persons"]
+    assert persons_params[0]["status_ids[]"] == ["1"]
+    groups_params = [q for _, p, q in ct_data.requests if p == "/groups"]
+    assert all("query" in q or "group_type_ids[]" in q for q in groups_params)
+
+
+def test_set_expressions(api, ct_data):
+    changes = plan(
+        api,
+        {
+            "Alle": (Status("Freund") | Tag("Chor")) - Role("Dienst"),
+            "Leiter": roles({"Dienst": {"Mitarbeiter"}}) & MemberStatus(),
+        },
+    )
+
+    assert changes == [
+        (ADD_TO_GROUP, 2, 900),
+        (REMOVE_FROM_GROUP, 1, 900),
+    ]
+    # only the tags of the rules are listed
+    assert ct_data.count("GET", "/tags/1/persons") == 1
+    assert ct_data.count("GET", r"/tags/2/persons|/persons/\d+/tags") == 0
+
+
+def test_tags_without_tag_listings(api, ct_data):
+    ct_data.route("GET", "/tags", lambda p, q: ({}, 404))
+    ct_data.route(
+        "GET",
+        r"/persons/(\d+)/tags",
+        lambda p, q: {"data": [{"name": "Chor"}] if p == "/persons/2/tags" else []},
+    )
+    ct_data.paged("/persons", PERSONS, page_size=100)
+
+    assert plan(api, {"Alle": Tag("Chor")}) == [
+        (ADD_TO_GROUP, 2, 900),
+        (REMOVE_FROM_GROUP, 1, 900),
+        (REMOVE_FROM_GROUP, 6, 900),
+    ]
+    assert ct_data.count("GET", r"/persons/\d+/tags") == len(PERSONS)
+
+
+def test_unknown_group(api, ct_data):
+    with pytest.raises(ValueError):
+        AutoGroups({"Gibt es nicht": MemberStatus()}).plan(api)
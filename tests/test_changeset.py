@@ -0,0 +1,51 @@
+from churchtools import ChangeSet, RetryPolicy
+
+
+def test_describe_and_serialize():
+    changes = ChangeSet()
+    changes.add_to_group(who=1, to=10)
+    changes.remove_from_group(who=2, from_=10)
+    changes.set_person_status(3, 5, label="Mitarbeiter (EA)")
+
+    assert changes.describe() == (
+        "- add #1 to group 10\n"
+        "- remove #2 from group 10\n"
+        "- set status of #3 to 5 (Mitarbeiter (EA))"
+    )
+    assert list(ChangeSet.from_json(changes.to_json())) == list(changes)
+
+
+def test_apply_retries_and_reports_failures(make_api, ct_server):
+    calls = []
+
+    def flaky(path, params):
+        calls.append(path)
+        if path == "/groups/10/members/1" and calls.count(path) == 1:
+            return {}, 503
+        if path == "/groups/10/members/2":
+            return {}, 409
+        if path == "/groups/10/members/4":
+            return {}, 403
+        if path == "/groups/10/members/5":
+            return {}, 500
+        return {"data": {}}
+
+    ct_server.route("PUT", r"/groups/\d+/members/\d+", flaky)
+    ct_server.route("PATCH", r"/persons/\d+", lambda p, q: {"data": {}})
+    api = make_api(retry=RetryPolicy(retries=2, backoff=0))
+    changes = ChangeSet()
+    for person_id in (1, 2, 4, 5):
+        changes.add_to_group(who=person_id, to=10)
+    changes.set_person_status(3, 5)
+
+    result = changes.apply(api, retries=2, retry_delay=0)
+
+    assert not result
+    assert [c.person_id for c in result.applied] == [1, 3]
+    assert [c.person_id for c, _ in result.failed] == [2, 4, 5]
+    # the session retried the server errors, the change set the conflicts
+    assert calls.count("/groups/10/members/1") == 2
+    assert calls.count("/groups/10/members/2") == 3
+    assert calls.count("/groups/10/members/4") == 1
+    assert calls.count("/groups/10/members/5") == 3
+    assert "3 failed" in result.summary()
@@ -0,0 +1,338 @@
+import gc
+import threading
+import time
+import weakref
+
+import pytest
+import requests
+
+from churchtools import EntityCache
+from churchtools.models import Person
+
+
+def test_paginate_yields_all_pages_in_order(api, ct_server):
+    persons = [{"id": i} for i in range(1, 12)]
+    ct_server.paged("/persons", persons, page_size=2)
+
+    assert [p["id"] for p in api.get_persons()] == list(range(1, 12))
+    assert ct_server.count("GET", "/persons") == 6
+
+
+def test_paginate_passes_limit(make_api, ct_server):
+    persons = [{"id": i} for i in range(1, 12)]
+    ct_server.paged("/persons", persons, page_size=2)
+    api = make_api(page_limit=5)
+
+    assert [p["id"] for p in api.get_persons()] == list(range(1, 12))
+    assert ct_server.count("GET", "/persons") == 3
+    assert all(params["limit"] == ["5"] for _, _, params in ct_server.requests)
+
+
+def test_paginate_concurrently_in_page_order(make_api, ct_server):
+    persons = [{"id": i} for i in range(1, 41)]
+    paged = ct_server.paged("/persons", persons, page_size=2)
+    threads = set()
+
+    def slow_early_pages(path, params):
+        # earlier pages take longer, so that later ones are done first
+        threads.add(threading.get_ident())
+        time.sleep(0.002 * (-int(params["page"][0]) % 4))
+        return paged(path, params)
+
+    ct_server.route("GET", "/persons", slow_early_pages)
+    api = make_api(max_workers=4)
+
+    assert [p["id"] for p in api.get_persons()] == list(range(1, 41))
+    assert ct_server.count("GET", "/persons") == 20
+    assert len(threads - {threading.get_ident()}) > 1
+
+
+def test_paginate_cancels_pending_pages_when_closed(make_api, ct_server):
+    paged = ct_server.paged("/persons", [{"id": i} for i in range(1, 41)])
+    release = threading.Event()
+
+    def blocking_pages(path, params):
+        if int(params["page"][0]) > 2:
+            release.wait(5)
+        return paged(path, params)
+
+    ct_server.route("GET", "/persons", blocking_pages)
+    api = make_api(max_workers=2)
+    persons = api.paginate(api._base_url + "/persons")
+
+    # the first two pages; both workers then wait in pages 3 and 4
+    assert [next(persons)["id"] for _ in range(4)] == [1, 2, 3, 4]
+    persons.close()
+    release.set()
+    api._executor.shutdown(wait=True)
+
+    pages = {int(params["page"][0]) for _, _, params in ct_server.requests}
+    assert pages <= {1, 2, 3, 4}
+
+
+def test_paginate_without_pagination_meta(api, ct_server):
+    ct_server.route("GET", "/statuses", lambda p, q: {"data": [{"id": 1}], "meta": {}})
+
+    assert list(api.get_statuses()) == [{"id": 1}]
+
+
+def test_paginate_does_not_modify_params(api, ct_server):
+    ct_server.paged("/persons", [{"id": 1}, {"id": 2}, {"id": 3}])
+    params = {"status_ids[]": [1]}
+
+    list(api.paginate(api._base_url + "/persons", params=params))
+
+    assert params == {"status_ids[]": [1]}
+
+
+MASTERDATA = {
+    "groupTypes": [{"id": 1, "name": "Kleingruppe"}, {"id": 2, "name": "Dienst"}],
+    "roles": [
+        {"id": 10, "groupTypeId": 1, "name": "Leiter"},
+        {"id": 11, "groupTypeId": 2, "name": "Leiter"},
+        {"id": 12, "groupTypeId": 2, "name": "Mitarbeiter"},
+    ],
+}
+
+STATUSES = [
+    {"id": 1, "name": "Mitglied", "isMember": True},
+    {"id": 2, "name": "Freund", "isMember": False},
+]
+
+
+def test_masterdata_is_downloaded_once(api, ct_server):
+    ct_server.route("GET", "/person/masterdata", lambda p, q: {"data": MASTERDATA})
+    ct_server.route("GET", "/statuses", lambda p, q: {"data": STATUSES, "meta": {}})
+
+    assert api.get_id_of_group_type("Dienst") == 2
+    assert api.get_id_of_group_role(2, "Leiter") == 11
+    assert api.get_id_of_group_role(1, "Leiter") == 10
+    assert api.get_status_ids() == {"Mitglied": 1, "Freund": 2}
+    assert api.masterdata.member_status_ids == [1]
+    with pytest.raises(ValueError):
+        api.get_id_of_group_type("Gremium")
+    with pytest.raises(ValueError):
+        api.get_id_of_group_role(1, "Mitarbeiter")
+
+    assert ct_server.count("GET", "/person/masterdata") == 1
+    assert ct_server.count("GET", "/statuses") == 1
+
+    api.masterdata.refresh()
+    assert ct_server.count("GET", "/person/masterdata") == 2
+
+
+def test_clients_are_not_kept_alive(make_api):
+    api = make_api()
+    ref = weakref.ref(api)
+    del api
+    gc.collect()
+    assert ref() is None
+
+
+def test_get_persons_by_ids_fetches_in_chunks(api, ct_server, monkeypatch):
+    monkeypatch.setattr("churchtools.IDS_CHUNK_SIZE", 3)
+    persons = {
+        i: {"id": i, "emails": [{"email": f"{i}@x.de", "isDefault": i % 2 == 0}]}
+        for i in range(1, 8)
+    }
+
+    def handler(path, params):
+        ids = [int(i) for i in params["ids[]"]]
+        return {"data": [persons[i] for i in ids if i in persons], "meta": {}}
+
+    ct_server.route("GET", "/persons", handler)
+
+    result = api.get_persons_by_ids([7, 1, 2, 3, 4, 5, 6, 42, 1])
+    assert result == persons
+    assert ct_server.count("GET", "/persons") == 3
+
+    assert api.get_default_emails([1, 2, 3, 4]) == {2: "2@x.de", 4: "4@x.de"}
+
+
+def test_get_tags_for_persons(api, ct_server):
+    tags = [{"id": 1, "name": "tag0"}, {"id": 2, "name": "tag1"}]
+    ct_server.route("GET", "/tags", lambda p, q: {"data": tags})
+    ct_server.paged("/tags/1/persons", [{"id": 2}, {"id": 4}])
+    ct_server.paged("/tags/2/persons", [{"id": 1}, {"id": 3}, {"id": 5}])
+
+    result = api.get_tags_for_persons([1, 2, 3, 1, 6])
+    assert result == {1: {"tag1"}, 2: {"tag0"}, 3: {"tag1"}, 6: set()}
+    assert ct_server.count("GET", r"/persons/\d+/tags") == 0
+
+    assert api.get_tags_for_persons([1, 2], names=["tag0"]) == {1: set(), 2: {"tag0"}}
+    # only the persons of the given tag are listed
+    assert ct_server.count("GET", "/tags/1/persons") == 2
+    assert ct_server.count("GET", "/tags/2/persons") == 2
+
+
+def test_get_tags_for_persons_falls_back_to_persons(api, ct_server):
+    def handler(path, params):
+        person_id = int(path.split("/")[2])
+        return {"data": [{"name": f"tag{person_id % 2}"}]}
+
+    ct_server.route("GET", "/tags", lambda p, q: {"data": [{"id": 1, "name": "x"}]})
+    ct_server.route("GET", r"/persons/\d+/tags", handler)
+
+    tags = api.get_tags_for_persons([1, 2, 3, 1])
+    assert tags == {1: {"tag1"}, 2: {"tag0"}, 3: {"tag1"}}
+    assert ct_server.count("GET", r"/persons/\d+/tags") == 3
+    assert api.get_tags_for_persons([1, 2], names=["x", "tag0"]) == {
+        1: set(),
+        2: {"tag0"},
+    }
+
+
+def test_get_members_of_groups(api, ct_server, monkeypatch):
+    monkeypatch.setattr("churchtools.IDS_CHUNK_SIZE", 2)
+    members = [
+        {"personId": 1, "groupId": 10, "groupTypeRoleId": 5},
+        {"personId": 1, "groupId": 11, "groupTypeRoleId": 6},
+        {"personId": 2, "groupId": 11, "groupTypeRoleId": 5},
+        {"personId": 3, "groupId": 12, "groupTypeRoleId": 5},
+        {"personId": 4, "groupId": 13, "groupTypeRoleId": 5},
+    ]
+
+    def handler(path, params):
+        group_ids = {int(i) for i in params["group_ids[]"]}
+        return {"data": [m for m in members if m["groupId"] in group_ids], "meta": {}}
+
+    ct_server.route("GET", "/groups/members", handler)
+
+    assert api.get_members_of_groups([10, 11, 12]) == {
+        1: [(10, 5), (11, 6)],
+        2: [(11, 5)],
+        3: [(12, 5)],
+    }
+    assert ct_server.count("GET", "/groups/members") == 2
+    assert api.get_members_of_groups([11], role_ids=[6]) == {1: [(11, 6)]}
+
+
+def test_map_concurrent_uses_one_session_per_thread(make_api, ct_server):
+    ct_server.route("GET", r"/persons/\d+", lambda p, q: {"data": {"path": p}})
+    api = make_api(max_workers=4)
+
+    def get_person_and_session(person_id):
+        return api.get_person(person_id)["path"], threading.get_ident(), api._session
+
+    results = api.map_concurrent(get_person_and_session, range(20))
+
+    assert [path for path, _, _ in results] == [f"/persons/{i}" for i in range(20)]
+    sessions = {thread: session for _, thread, session in results}
+    assert len(set(map(id, sessions.values()))) == len(sessions)
+    assert threading.get_ident() not in sessions
+
+
+def test_nested_fan_out_does_not_dead_lock(make_api, ct_server):
+    ct_server.paged(r"/groups/\d+/members", [{"personId": i} for i in range(9)])
+    api = make_api(max_workers=2)
+
+    members = api.map_concurrent(
+        lambda group_id: len(list(api.get_group_members(group_id))), range(6)
+    )
+
+    assert members == [9] * 6
+
+
+def test_closed_clients_are_not_kept_alive(make_api, ct_server):
+    ct_server.route("GET", r"/persons/\d+", lambda p, q: {"data": {}})
+    api = make_api(max_workers=4)
+    api.map_concurrent(api.get_person, range(8))
+    api.close()
+    ref = weakref.ref(api)
+    del api
+    gc.collect()
+    assert ref() is None
+
+
+def test_close_closes_the_sessions_of_all_threads(make_api, ct_server, monkeypatch):
+    ct_server.route("GET", r"/persons/\d+", lambda p, q: {"data": {}})
+    closed = []
+    monkeypatch.setattr(requests.Session, "close", lambda self: closed.append(self))
+    api = make_api(max_workers=4)
+    api.get_person(1)
+    api.map_concurrent(api.get_person, range(8))
+    sessions = list(api._sessions)
+
+    api.close()
+
+    # the session of this thread and those of the worker threads
+    assert len(sessions) > 1 and closed == sessions
+    assert api._sessions == []
+
+
+def test_entity_cache(api, ct_server):
+    ct_server.route("GET", r"/persons/\d+", lambda p, q: {"data": {"statusId": 1}})
+    ct_server.route("PATCH", "/persons/1", lambda p, q: {"data": {"statusId": 2}})
+    ct_server.route("GET", "/persons/1/groups", lambda p, q: {"data": []})
+    ct_server.route("PUT", "/groups/5/members/1", lambda p, q: {"data": {}})
+    ct_server.route("GET", "/groups/5", lambda p, q: {"data": {"id": 5}})
+
+    assert api.get_person(1) == {"statusId": 1}
+    assert api.get_person("1") == {"statusId": 1}
+    api.set_person_status(1, 2)
+    assert api.get_person(1) == {"statusId": 2}
+    assert ct_server.count("GET", "/persons/1") == 1
+
+    api.get_memberships(1)
+    api.get_group(id=5)
+    api.add_to_group(who=1, to=5)
+    api.get_memberships(1)
+    api.get_group(id=5)
+    assert ct_server.count("GET", "/persons/1/groups") == 2
+    assert ct_server.count("GET", "/groups/5") == 2
+
+    assert api.entity_cache.stats["hits"] == 2
+
+
+def test_entity_cache_is_bounded():
+    cache = EntityCache(max_entries=2)
+    cache.put("person", 1, "a")
+    cache.put("person", 2, "b")
+    cache.get("person", 1)
+    cache.put("person", 3, "c")
+
+    assert cache.get("person", 1) == "a"
+    assert cache.get("person", 2) is None
+    assert cache.stats == {"hits": 2, "misses": 1, "size": 2}
+
+
+def test_models(api, ct_server):
+    person = {
+        "id": 1,
+        "statusId": 3,
+        "firstName": "Max",
+        "lastName": "Müller",
+        "emails": [
+            {"email": "alt@example.com", "isDefault": False},
+            {"email": "max@example.com", "isDefault": True},
+        ],
+    }
+    ct_server.paged("/persons", [person])
+    ct_server.paged(
+        "/groups/5/members",
+        [{"personId": 1, "groupTypeRoleId": 8, "groupMemberStatus": "active"}],
+    )
+    group = {"id": 5, "name": "Technik", "information": {"groupTypeId": 2}}
+    ct_server.paged("/groups", [group])
+
+    (model,) = api.get_persons(as_model=True)
+    assert (model.id, model.status_id, model.default_email) == (
+        1,
+        3,
+        "max@example.com",
+    )
+    assert not hasattr(model, "__dict__")
+    # the payload is only kept on request
+    with pytest.raises(ValueError):
+        model.raw
+    assert Person.from_json(person, keep_raw=True).raw == person
+    assert {model, Person.from_json(person)} == {model}
+    (member,) = api.get_group_members(5, as_model=True)
+    assert (member.person_id, member.group_id, member.role_id) == (1, 5, 8)
+    assert member.is_active
+    (model,) = api.get_persons(as_model=True, keep_raw=True)
+    assert model.raw == person
+    (member,) = api.get_group_members(5, as_model=True, keep_raw=True)
+    assert member.raw["groupTypeRoleId"] == 8
+    (model,) = api.get_groups(as_model=True, keep_raw=True)
+    assert (model.group_type_id, model.raw) == (2, group)
@@ -0,0 +1,42 @@
+import datetime
+
+import pytest
+
+from gottesdienstplan.dates import parse_date
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("05.01.2025", datetime.datetime(2025, 1, 5)),
+        ("So., 5.1.25", datetime.datetime(2025, 1, 5)),
+        ("Sonntag, 05.01.2025 10:30 Uhr", datetime.datetime(2025, 1, 5, 10, 30)),
+        ("5. Jan 2025", datetime.datetime(2025, 1, 5)),
+        (" Mi., 12. März 2025, 19.00 ", datetime.datetime(2025, 3, 12, 19)),
+    ],
+)
+def test_parse_known_formats(value, expected):
+    assert parse_date(value) == expected
+
+
+def test_parse_date_rejects_invalid_dates():
+    with pytest.raises(ValueError):
+        parse_date("1.13.2025")
+    with pytest.raises(ValueError):
+        parse_date("kein Datum")
+
+
+def test_parse_date_falls_back_to_dateparser(monkeypatch):
+    import dateparser
+
+    calls = []
+
+    def parse(value, **kwargs):
+        calls.append(value)
+        return datetime.datetime(2025, 1, 5)
+
+    monkeypatch.setattr(dateparser, "parse", parse)
+
+    assert parse_date("2025-01-05 (Epiphanias)") == datetime.datetime(2025, 1, 5)
+    assert parse_date("05.01.2025") == datetime.datetime(2025, 1, 5)
+    assert calls == ["2025-01-05 (Epiphanias)"]
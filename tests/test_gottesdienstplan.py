@@ -0,0 +1,251 @@
+import datetime
+import json
+import re
+import threading
+
+import pytest
+
+from churchtools.metrics import REGISTRY
+from gottesdienstplan import plan
+
+SPREADSHEET_ID = "sheet-id"
+
+
+class FakeRequest:
+    """Stand-in for a request of the Google API client."""
+
+    def __init__(self, service, method, endpoint, result):
+        self._service = service
+        self.method = method
+        self._endpoint = endpoint
+        self._result = result
+        self.postproc = lambda response, content: json.loads(content)
+
+    def execute(self, http=None):
+        with self._service.lock:
+            self._service.requests.append((self._endpoint, threading.get_ident()))
+        return self.postproc(None, json.dumps(self._result()).encode())
+
+
+class FakeSheetsService:
+    """Minimal in-memory Sheets API with one spreadsheet.
+
+    ``sheets`` maps sheet titles to rows of cell values. Like the real API,
+    empty rows at the end of a range are left out and ranges beyond the grid
+    of a sheet (at least 1000 rows) are rejected."""
+
+    def __init__(self, sheets):
+        self.sheets = sheets
+        self.lock = threading.Lock()
+        self.requests = []
+
+    def count(self, endpoint: str) -> int:
+        return sum(1 for e, _ in self.requests if e == endpoint)
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return _Values(self)
+
+    def row_count(self, title: str) -> int:
+        return max(1000, len(self.sheets[title]))
+
+    def get(self, spreadsheetId, fields=None):
+        sheets = [
+            {
+                "properties": {
+                    "sheetId": i,
+                    "title": title,
+                    "gridProperties": {"rowCount": self.row_count(title)},
+                }
+            }
+            for i, title in enumerate(self.sheets)
+        ]
+        return FakeRequest(self, "GET", "spreadsheets.get", lambda: {"sheets": sheets})
+
+    def read(self, cell_range: str):
+        title, cells = cell_range.split("!")
+        first, last_column, last = re.fullmatch(
+            r"A(\d+)(?::([A-Z])(\d+))?", cells
+        ).groups()
+        first = int(first)
+        last = int(last) if last else first
+        if last > self.row_count(title):
+            raise ValueError(f"Range ({cell_range}) exceeds grid limits")
+        rows = [
+            list(row) if last_column else row[:1]
+            for row in self.sheets[title][first - 1 : last]
+        ]
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+
+class _Values:
+    def __init__(self, service: FakeSheetsService):
+        self._service = service
+
+    def get(self, spreadsheetId, range, **kwargs):
+        def result():
+            rows = self._service.read(range)
+            return {"range": range, "values": rows} if rows else {"range": range}
+
+        return FakeRequest(self._service, "GET", "values.get", result)
+
+    def batchGet(self, spreadsheetId, ranges, **kwargs):
+        def result():
+            value_ranges = []
+            for cell_range in ranges:
+                rows = self._service.read(cell_range)
+                value_ranges.append({"range": cell_range, "values": rows})
+            return {"valueRanges": value_ranges}
+
+        return FakeRequest(self._service, "GET", "values.batchGet", result)
+
+
+def rows(n, start=1):
+    return [[f"{i}", f"row {i}"] for i in range(start, start + n)]
+
+
+@pytest.fixture
+def sheets(monkeypatch):
+    service = FakeSheetsService({"Plan": [], "Archiv": []})
+    monkeypatch.setattr(plan, "spreadsheet_service", lambda: service)
+    monkeypatch.setattr(plan, "authorized_http", lambda: None)
+    monkeypatch.setattr(plan, "_sheet_properties", {})
+    return service
+
+
+def test_iter_rows_values_stops_at_empty_row(sheets):
+    sheets.sheets["Plan"] = rows(4) + [["", " "]] + rows(3, start=6)
+    sheet = plan.GoogleSheet(SPREADSHEET_ID, "Plan")
+
+    assert list(sheet.iter_rows_values(chunk_size=2)) == rows(4)
+
+
+def test_iter_rows_values_stops_at_short_chunk(sheets):
+    sheets.sheets["Plan"] = rows(5)
+    sheet = plan.GoogleSheet(SPREADSHEET_ID, "Plan")
+
+    assert list(sheet.iter_rows_values(starting_row=2, chunk_size=3)) == rows(4, 2)
+    assert sheets.count("values.get") == 2
+
+
+def test_read_ahead_thread_is_reused(sheets):
+    sheets.sheets["Plan"] = rows(5)
+    sheet = plan.GoogleSheet(SPREADSHEET_ID, "Plan")
+
+    list(sheet.iter_rows_values(chunk_size=2))
+    list(sheet.iter_rows_values(chunk_size=3))
+
+    threads = {
+        thread for endpoint, thread in sheets.requests if endpoint != "spreadsheets.get"
+    }
+    assert len(threads) == 1 and threading.get_ident() not in threads
+
+
+def plan_rows(n_past, n_future):
+    """Header rows, then one row per day around 2025-01-01."""
+    start = datetime.date(2025, 1, 1) - datetime.timedelta(days=n_past)
+    dates = [start + datetime.timedelta(days=i) for i in range(n_past + n_future)]
+    return [["Plan"], ["Datum", "Uhrzeit"]] + [
+        [d.strftime("%d.%m.%Y"), "10:00"] for d in dates
+    ]
+
+
+NOW = datetime.datetime(2024, 12, 31, 12)
+
+
+@pytest.fixture
+def godi_plan(sheets, monkeypatch):
+    monkeypatch.setenv("SPREADSHEET_ID", SPREADSHEET_ID)
+    sheets.sheets[plan.SPREADSHEET_NAME] = []
+    return plan.Gottesdienstplan()
+
+
+@pytest.mark.parametrize(
+    "n_past, n_future",
+    [(0, 5), (5, 0), (5, 5), (3000, 5), (0, 0)],
+)
+def test_find_first_future_row(sheets, monkeypatch, n_past, n_future):
+    sheets.sheets[plan.SPREADSHEET_NAME] = plan_rows(n_past, n_future)
+    # the grid of the sheet is read when the plan is opened
+    monkeypatch.setenv("SPREADSHEET_ID", SPREADSHEET_ID)
+    godi_plan = plan.Gottesdienstplan()
+
+    assert godi_plan.find_first_future_row(now=NOW) == 3 + n_past
+    # the past rows are not read one by one
+    assert len(sheets.requests) < 30
+
+
+def test_find_first_future_row_reads_whole_rows(sheets, godi_plan):
+    rows = plan_rows(20, 5)
+    # the date of a past row was cleared, but the row is not empty
+    rows[5][0] = ""
+    sheets.sheets[plan.SPREADSHEET_NAME] = rows
+
+    with pytest.raises(ValueError):
+        godi_plan.find_first_future_row(now=NOW)
+    # an empty row ends the plan
+    rows[5] = []
+    assert godi_plan.find_first_future_row(now=NOW) == 6
+
+
+@pytest.mark.parametrize("n_past, expected", [(990, 993), (998, 1001)])
+def test_find_first_future_row_stays_in_grid(sheets, godi_plan, n_past, expected):
+    # the plan ends before or at the end of the grid of 1000 rows
+    sheets.sheets[plan.SPREADSHEET_NAME] = plan_rows(n_past, 0)
+
+    assert godi_plan.find_first_future_row(now=NOW) == expected
+
+
+def test_batch_get_prefixes_ranges_with_sheet_name(sheets):
+    sheets.sheets["Plan"] = rows(3)
+    sheets.sheets["Archiv"] = [["Archiv"]]
+    sheet = plan.GoogleSheet(SPREADSHEET_ID, "Plan")
+
+    assert sheet.batch_get(["A2:B3", "Archiv!A1"]) == [rows(2, 2), [["Archiv"]]]
+    assert sheets.count("values.batchGet") == 1
+
+
+def test_iter_row_data_reads_headers_with_first_rows(sheets, godi_plan):
+    sheets.sheets[plan.SPREADSHEET_NAME] = plan_rows(0, 7)
+
+    events = list(godi_plan.iter_row_data(chunk_size=3))
+
+    assert [e["Datum"] for e in events] == [
+        datetime.datetime(2025, 1, d) for d in range(1, 8)
+    ]
+    assert events[0]["Uhrzeit"] == "10:00"
+    # the first chunk is read with the headers and handed over
+    assert sheets.count("values.batchGet") == 1
+    assert sheets.count("values.get") == 2
+
+
+def test_sheet_properties_are_shared(sheets):
+    plan_sheet = plan.GoogleSheet(SPREADSHEET_ID, "Plan")
+    archive = plan.GoogleSheet(SPREADSHEET_ID, "Archiv")
+
+    assert (plan_sheet._sheet_id, archive._sheet_id) == (0, 1)
+    assert sheets.count("spreadsheets.get") == 1
+    with pytest.raises(ValueError):
+        plan.GoogleSheet(SPREADSHEET_ID, "Gibt es nicht")
+
+
+def test_execute_records_errors_and_response_bytes(sheets):
+    REGISTRY.reset()
+    sheets.sheets["Plan"] = rows(3)
+    sheet = plan.GoogleSheet(SPREADSHEET_ID, "Plan")
+    request = sheets.values().get(spreadsheetId=SPREADSHEET_ID, range="Plan!A1:B3")
+    size = len(json.dumps(request._result()).encode())
+
+    sheet._execute("values.get", request)
+    failing = FakeRequest(sheets, "GET", "values.get", lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        sheet._execute("values.get", failing)
+
+    text = REGISTRY.to_prometheus("job")
+    assert 'endpoint="values.get",status="200"} 1' in text
+    assert 'endpoint="values.get",status="error"} 1' in text
+    assert f'endpoint="values.get"}} {size}' in text
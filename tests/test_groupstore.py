@@ -0,0 +1,54 @@
+from churchtools import GroupMemberStore
+from churchtools.models import Group
+
+
+def group(id_, member_count, modified=1):
+    return Group(id_, f"Gruppe {id_}", 1, member_count, f"2024-01-{modified:02d}")
+
+
+def test_refresh_downloads_only_changed_groups(api, ct_server, tmp_path):
+    members = {
+        10: [{"personId": 1, "groupId": 10, "groupTypeRoleId": 5}],
+        20: [
+            {"personId": 1, "groupId": 20, "groupTypeRoleId": 6},
+            {"personId": 2, "groupId": 20, "groupTypeRoleId": 5},
+        ],
+    }
+
+    def handler(path, params):
+        group_ids = [int(i) for i in params["group_ids[]"]]
+        return {"data": [m for i in group_ids for m in members[i]], "meta": {}}
+
+    ct_server.route("GET", "/groups/members", handler)
+    path = tmp_path / "groups.json"
+
+    assert GroupMemberStore(path).refresh(api, [group(10, 1), group(20, 2)]) == 2
+
+    members[10].append({"personId": 3, "groupId": 10, "groupTypeRoleId": 5})
+    store = GroupMemberStore(path)
+    assert store.refresh(api, [group(10, 2), group(20, 2)]) == 1
+    assert ct_server.requests[-1][2]["group_ids[]"] == ["10"]
+    assert store.get_members_of_groups([10, 20], role_ids=[5]) == {
+        1: [(10, 5)],
+        2: [(20, 5)],
+        3: [(10, 5)],
+    }
+
+    # removed groups are dropped, a cleared store downloads everything
+    store.clear()
+    assert store.refresh(api, [group(20, 2)]) == 1
+    assert GroupMemberStore(path).get_members_of_groups([10, 20]) == {
+        1: [(20, 6)],
+        2: [(20, 5)],
+    }
+
+
+def test_from_environ(monkeypatch, tmp_path):
+    monkeypatch.delenv("CT_GROUP_STORE_PATH", raising=False)
+    monkeypatch.delenv("CT_GROUP_STORE_FULL_REFRESH_HOURS", raising=False)
+    assert GroupMemberStore.from_environ() is None
+
+    monkeypatch.setenv("CT_GROUP_STORE_PATH", str(tmp_path / "groups.json"))
+    assert GroupMemberStore.from_environ()._full_refresh_interval == 7 * 24 * 3600
+    monkeypatch.setenv("CT_GROUP_STORE_FULL_REFRESH_HOURS", "72")
+    assert GroupMemberStore.from_environ()._full_refresh_interval == 72 * 3600
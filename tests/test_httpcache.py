@@ -0,0 +1,103 @@
+import time
+
+import pytest
+
+from churchtools import EntityCache, HttpCache
+
+
+@pytest.fixture
+def make_api(make_api):
+    # bypass the in-process entity cache to see what the HTTP cache does
+    def wrapped_function(**kwargs):
+        return make_api(entity_cache=EntityCache(ttl=0), **kwargs)
+
+    return wrapped_function
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = HttpCache(tmp_path / "cache.sqlite")
+    yield cache
+    cache.close()
+
+
+def test_get_requests_are_cached(make_api, ct_server, cache):
+    ct_server.paged("/persons", [{"id": 1}, {"id": 2}, {"id": 3}])
+    ct_server.route("GET", r"/persons/\d+/logintoken", lambda p, q: {"data": "t"})
+
+    for _ in range(2):
+        api = make_api(cache=cache)
+        assert [p["id"] for p in api.get_persons()] == [1, 2, 3]
+        assert api.get_login_token(1) == "t"
+
+    assert ct_server.count("GET", "/persons") == 2
+    # not configured with a time-to-live
+    assert ct_server.count("GET", r"/persons/\d+/logintoken") == 2
+
+
+def test_streamed_responses_are_not_stored(make_api, ct_server, cache):
+    ct_server.paged("/persons", [{"id": 1}, {"id": 2}, {"id": 3}])
+
+    for _ in range(2):
+        api = make_api(cache=cache, stream_pages=True)
+        assert [p["id"] for p in api.get_persons()] == [1, 2, 3]
+
+    assert ct_server.count("GET", "/persons") == 4
+
+
+def test_cache_is_scoped_by_token(make_api, ct_server, cache):
+    ct_server.route("GET", "/persons/1", lambda p, q: {"data": {"id": 1}})
+
+    make_api(cache=cache).get_person(1)
+    user_api = make_api(cache=cache)
+    user_api._session.headers["Authorization"] = "Login other"
+    user_api.get_person(1)
+
+    assert ct_server.count("GET", "/persons/1") == 2
+
+
+def test_mutations_invalidate(make_api, ct_server, cache):
+    ct_server.route("GET", "/persons/1", lambda p, q: {"data": {"id": 1}})
+    ct_server.route("GET", "/persons/2", lambda p, q: {"data": {"id": 2}})
+    ct_server.route("PATCH", "/persons/1", lambda p, q: {"data": {"id": 1}})
+    api = make_api(cache=cache)
+
+    api.get_person(1)
+    api.get_person(2)
+    api.set_person_status(1, 3)
+    api.get_person(1)
+    api.get_person(2)
+
+    assert ct_server.count("GET", "/persons/1") == 2
+    assert ct_server.count("GET", "/persons/2") == 1
+
+
+def test_expired_entries_are_refetched(make_api, ct_server, tmp_path):
+    ct_server.route("GET", "/statuses", lambda p, q: {"data": [], "meta": {}})
+    cache = HttpCache(tmp_path / "cache.sqlite", ttls={"/statuses": 1})
+    api = make_api(cache=cache)
+
+    list(api.get_statuses())
+    list(api.get_statuses())
+    assert ct_server.count("GET", "/statuses") == 1
+
+    time.sleep(1.1)
+    assert cache.purge(expired_only=True) == 1
+    list(api.get_statuses())
+    assert ct_server.count("GET", "/statuses") == 2
+
+
+def test_least_recently_used_entries_are_evicted(make_api, ct_server, tmp_path):
+    ct_server.route("GET", r"/persons/\d+", lambda p, q: {"data": {"x": "a" * 100}})
+    cache = HttpCache(tmp_path / "cache.sqlite", max_bytes=250)
+    api = make_api(cache=cache)
+
+    api.get_person(1)
+    api.get_person(2)
+    api.get_person(1)
+    api.get_person(3)  # evicts person 2
+    api.get_person(1)
+    api.get_person(2)
+
+    assert ct_server.count("GET", "/persons/1") == 1
+    assert ct_server.count("GET", "/persons/2") == 2
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from churchtools import jsonstream
+
+
+def chunks(document, size):
+    data = json.dumps(document, ensure_ascii=False).encode()
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 1000])
+def test_iter_items(size):
+    document = {
+        "data": [{"id": 1, "name": "Jürgen"}, 12345, "ä,]}", [], None],
+        "meta": {"pagination": {"lastPage": 3}},
+    }
+    rest = {}
+
+    items = list(jsonstream.iter_items(chunks(document, size), "data", rest))
+
+    assert items == document["data"]
+    assert rest == {"meta": document["meta"]}
+
+
+def test_iter_items_empty():
+    assert list(jsonstream.iter_items(chunks({"data": []}, 2))) == []
+    assert list(jsonstream.iter_items(chunks({}, 2))) == []
+
+
+def test_iter_items_truncated():
+    with pytest.raises(json.JSONDecodeError):
+        list(jsonstream.iter_items([b'{"data": [{"id": 1}, {"id"']))
+
+
+def test_paginate_streamed(make_api, ct_server):
+    persons = [{"id": i} for i in range(1, 8)]
+    ct_server.paged("/persons", persons, page_size=3)
+    api = make_api(stream_pages=True)
+
+    assert [p["id"] for p in api.get_persons()] == list(range(1, 8))
+    assert ct_server.count("GET", "/persons") == 3
@@ -0,0 +1,51 @@
+import pytest
+
+from churchtools.metrics import REGISTRY, Metrics, normalize_endpoint
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    REGISTRY.reset()
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("/persons", "/persons"),
+        ("/persons/42/tags", "/persons/{id}/tags"),
+        ("/groups/1/members/23?x=1", "/groups/{id}/members/{id}"),
+        ("/person/masterdata", "/person/masterdata"),
+    ],
+)
+def test_normalize_endpoint(path, expected):
+    assert normalize_endpoint(path) == expected
+
+
+def test_prometheus_textfile(tmp_path):
+    metrics = Metrics()
+    metrics.observe("churchtools", "get", "/persons/{id}", 200, 0.07, 100)
+    metrics.observe("churchtools", "get", "/persons/{id}", 404, 3.0, 10)
+
+    path = metrics.write_textfile(tmp_path, "job")
+
+    text = path.read_text()
+    labels = 'job="job",service="churchtools",method="GET",endpoint="/persons/{id}"'
+    assert f'http_client_requests_total{{{labels},status="200"}} 1' in text
+    assert f'http_client_requests_total{{{labels},status="404"}} 1' in text
+    assert f"http_client_response_bytes_total{{{labels}}} 110" in text
+    assert f'http_client_request_duration_seconds_bucket{{{labels},le="0.1"}} 1' in text
+    assert (
+        f'http_client_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    )
+    assert f"http_client_request_duration_seconds_count{{{labels}}} 2" in text
+    assert "/persons/{id}" in metrics.summary()
+
+
+def test_churchtools_requests_are_recorded(api, ct_server):
+    ct_server.route("GET", r"/persons/\d+/tags", lambda p, q: {"data": []})
+
+    api.get_tags_for_persons([1, 2, 3])
+
+    assert 'endpoint="/persons/{id}/tags",status="200"} 3' in REGISTRY.to_prometheus(
+        "test"
+    )
@@ -0,0 +1,77 @@
+import datetime
+
+from churchtools import PersonStore
+
+
+def person(id_, status_id, modified):
+    return {
+        "id": id_,
+        "statusId": status_id,
+        "meta": {"modifiedDate": f"2024-01-{modified:02d}T10:00:00Z"},
+    }
+
+
+def test_refresh_downloads_only_modified_persons(api, ct_server, tmp_path):
+    persons = [person(1, 1, 1), person(2, 2, 3), person(3, 1, 2)]
+    ct_server.paged("/persons", persons)
+    path = tmp_path / "persons.json"
+
+    assert PersonStore(path).refresh(api) == 3
+
+    persons[0] = person(1, 2, 5)
+    del persons[2]
+    store = PersonStore(path)
+    assert store.refresh(api) == 2  # the boundary person is fetched again
+    assert store.ids_with_status([2]) == {1, 2}
+    # deleted persons remain until the next full reconcile
+    assert len(store) == 3
+    params = ct_server.requests[-1][2]
+    assert params["modified_after"] == ["2024-01-03T10:00:00+00:00"]
+
+    assert store.refresh(api, full=True) == 2
+    assert len(PersonStore(path)) == 2
+
+
+def test_refresh_keeps_no_personal_data(api, ct_server, tmp_path):
+    undated = {"id": 3, "statusId": 1, "meta": {"modifiedDate": None}}
+    persons = [dict(person(1, 1, 1), firstName="Anna"), undated]
+    ct_server.paged("/persons", persons)
+    path = tmp_path / "persons.json"
+
+    # persons without a modification date are counted, too
+    assert PersonStore(path).refresh(api) == 2
+    assert "Anna" not in path.read_text()
+    assert PersonStore(path).get(1) == person(1, 1, 1)
+
+
+def test_get_persons_modified_after(api, ct_server):
+    ct_server.paged("/persons", [person(1, 1, 1), person(2, 1, 5)])
+    since = datetime.datetime(2024, 1, 2, tzinfo=datetime.timezone.utc)
+
+    assert [p["id"] for p in api.get_persons(modified_after=since)] == [2]
+
+
+def test_get_persons_modified_after_naive_and_without_date(api, ct_server):
+    undated = {"id": 3, "statusId": 1, "meta": {"modifiedDate": None}}
+    ct_server.paged("/persons", [person(1, 1, 1), person(2, 1, 5), undated])
+
+    since = datetime.datetime(2024, 1, 2)
+    assert [p["id"] for p in api.get_persons(modified_after=since)] == [2, 3]
+    params = ct_server.requests[-1][2]
+    assert params["modified_after"] == ["2024-01-02T00:00:00+00:00"]
+
+
+def test_refresh_is_full_if_server_ignores_filter(api, ct_server, tmp_path):
+    persons = [person(1, 1, 1), person(2, 2, 3)]
+    ct_server.paged("/persons", persons)
+    store = PersonStore(tmp_path / "persons.json")
+    store.refresh(api)
+
+    # person 1 was not modified, but is sent again
+    assert store.refresh(api) == 1
+    assert api.modified_after_ignored
+
+    del persons[0]
+    assert store.refresh(api) == 1
+    assert "modified_after" not in ct_server.requests[-1][2]
+    assert len(store) == 1
@@ -0,0 +1,94 @@
+import email.utils
+import time
+
+import pytest
+import requests
+
+from churchtools import RetryPolicy
+from churchtools.ratelimit import AimdLimiter, parse_retry_after
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    delays = []
+    monkeypatch.setattr("churchtools.ratelimit.time.sleep", delays.append)
+    return delays
+
+
+def test_throttled_requests_are_retried(make_api, ct_server, no_sleep):
+    calls = []
+    api = make_api(max_workers=4)
+
+    def handler(path, params):
+        calls.append(path)
+        if len(calls) < 3:
+            return {}, 429, {"Retry-After": "2"}
+        return {"data": {"id": 1}}
+
+    ct_server.route("GET", "/persons/1", handler)
+
+    assert api.get_person(1) == {"id": 1}
+    assert no_sleep == [2.0, 2.0]
+    assert api._limiter.limit < 4
+
+
+def test_server_errors_are_not_retried_for_post(api, ct_server, no_sleep):
+    ct_server.route("POST", "/groups", lambda p, q: ({}, 503))
+    ct_server.route("GET", "/person/masterdata", lambda p, q: {"data": MASTERDATA})
+    ct_server.route("GET", "/statuses", lambda p, q: {"data": [], "meta": {}})
+
+    with pytest.raises(requests.HTTPError):
+        api.create_group("Neu", "Dienst")
+    assert ct_server.count("POST", "/groups") == 1
+
+
+def test_patch_is_retried_only_if_idempotent(api, ct_server, no_sleep):
+    calls = []
+
+    def flaky(path, params):
+        calls.append(path)
+        if len(calls) <= 2:
+            return {}, 503
+        return {"data": {"id": 1, "statusId": 2}}
+
+    ct_server.route("PATCH", "/persons/1", flaky)
+
+    response = api._session.patch(api._base_url + "/persons/1", json={})
+    assert response.status_code == 503
+    assert len(calls) == 1
+    assert api.set_person_status(1, 2) == {"id": 1, "statusId": 2}
+    assert len(calls) == 3
+
+
+def test_retries_give_up(make_api, ct_server, no_sleep):
+    ct_server.route("GET", "/persons/1", lambda p, q: ({}, 502))
+    api = make_api(retry=RetryPolicy(retries=3, backoff=1, max_backoff=2))
+
+    with pytest.raises(requests.HTTPError):
+        api.get_person(1)
+    assert ct_server.count("GET", "/persons/1") == 4
+    assert all(0 <= d <= 2 for d in no_sleep)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    date = email.utils.formatdate(time.time() + 60, usegmt=True)
+    assert 55 < parse_retry_after(date) <= 60
+
+
+def test_aimd_limiter():
+    limiter = AimdLimiter(max_limit=8)
+    limiter.acquire()
+    limiter.release(throttled=True)
+    limiter.acquire()
+    limiter.release(throttled=True)
+    assert limiter.limit == 2
+    for _ in range(40):
+        limiter.acquire()
+        limiter.release()
+    assert limiter.limit == 8
+
+
+MASTERDATA = {"groupTypes": [{"id": 2, "name": "Dienst"}], "roles": []}
@@ -0,0 +1,60 @@
+import pytest
+
+from churchtools import IdSet, reconcile as reconcile_module
+from churchtools.changeset import ADD_TO_GROUP, REMOVE_FROM_GROUP
+from churchtools.reconcile import diff, group_changes, reconcile
+
+
+@pytest.fixture(params=["numpy", "frozenset"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(reconcile_module, "numpy", None)
+
+
+def test_id_set_operations(backend):
+    a = IdSet([5, 3, 1, 3, 9])
+    b = IdSet({3, 4, 5})
+
+    assert list(a) == [1, 3, 5, 9]
+    assert all(type(i) is int for i in a | b)
+    assert len(a) == 4
+    assert 9 in a and 4 not in a
+    assert list(a - b) == [1, 9]
+    assert list(a & b) == [3, 5]
+    assert list(a | b) == [1, 3, 4, 5, 9]
+    assert a - [1, 2, 3] == {5, 9}
+    assert IdSet() == set()
+    assert list(b - a) == [4] and list(a & IdSet([9, 10])) == [9]
+    assert list(IdSet() | a) == list(a) and not IdSet() & a
+    assert {a: 1}[IdSet([1, 3, 5, 9])] == 1
+    assert hash(b) == hash(frozenset({3, 4, 5}))
+
+
+def test_diff(backend):
+    result = diff(desired={1, 2, 3}, current=[3, 4])
+
+    assert result.add == {1, 2}
+    assert result.remove == {4}
+    assert result.keep == {3}
+
+
+def test_reconcile_many_groups(backend):
+    everybody = IdSet(range(1, 6))
+    diffs = reconcile(
+        {10: everybody, 11: everybody, 12: [1]},
+        {10: [1, 2, 3, 4, 5], 11: [6], 13: [1]},
+    )
+
+    assert set(diffs) == {10, 11, 12}
+    assert not diffs[10].add and not diffs[10].remove
+    assert diffs[11].add == everybody and diffs[11].remove == {6}
+    assert diffs[12].add == {1}
+
+    changes = group_changes(diffs, labels={11: "Alle"})
+    assert sorted((c.action, c.person_id, c.target_id) for c in changes) == sorted(
+        [(ADD_TO_GROUP, i, 11) for i in range(1, 6)]
+        + [(REMOVE_FROM_GROUP, 6, 11), (ADD_TO_GROUP, 1, 12)]
+    )
+    assert {c.label for c in changes if c.target_id == 11} == {"Alle"}
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from churchtools.singleflight import AsyncSingleFlight, SingleFlight, request_key
+
+
+def test_request_key_ignores_parameter_order():
+    assert request_key("/x", {"a": 1, "b": [2, 3]}) == request_key(
+        "/x", {"b": [2, 3], "a": 1}
+    )
+    assert request_key("/x") == "/x"
+
+
+class CountingLock:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquired = 0
+
+    def __enter__(self):
+        self._lock.acquire()
+        self.acquired += 1
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
+
+
+def test_concurrent_calls_are_coalesced():
+    flight = SingleFlight()
+    # every call takes the lock once before the leader finishes
+    flight._lock = lock = CountingLock()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return {"data": 1}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do("k", fetch)))
+        for _ in range(5)
+    ]
+    threads[0].start()
+    started.wait()
+    for t in threads[1:]:
+        t.start()
+    deadline = time.monotonic() + 5
+    while lock.acquired < len(threads) and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [{"data": 1}] * 5
+    # later calls are not served from a finished flight
+    assert flight.do("k", lambda: 2) == 2
+
+
+def test_failed_calls_are_not_remembered():
+    flight = SingleFlight()
+    with pytest.raises(KeyError):
+        flight.do("k", lambda: {}["missing"])
+    assert flight.do("k", lambda: 1) == 1
+
+
+def test_async_calls_are_coalesced():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def main():
+        flight = AsyncSingleFlight()
+        return await asyncio.gather(*(flight.do("k", fetch) for _ in range(5)))
+
+    assert asyncio.run(main()) == [42] * 5
+    assert len(calls) == 1
@@ -0,0 +1,75 @@
+from churchtools import ChurchToolsSnapshot
+
+PERSONS = [
+    {"id": 1, "statusId": 1, "firstName": "Anna"},
+    {"id": 2, "statusId": 2, "firstName": "Bernd"},
+    {"id": 3, "statusId": 1, "firstName": "Clara"},
+]
+
+GROUPS = [
+    {
+        "id": 10,
+        "name": "Hauskreis",
+        "information": {"groupTypeId": 1, "groupStatusId": 1},
+    },
+    {
+        "id": 11,
+        "name": "Technik",
+        "information": {"groupTypeId": 2, "groupStatusId": 1, "note": "x"},
+    },
+    {"id": 12, "name": "Alt", "information": {"groupTypeId": 2, "groupStatusId": 3}},
+]
+
+MEMBERS = [
+    {"personId": 1, "groupId": 10, "groupTypeRoleId": 5},
+    {"personId": 1, "groupId": 11, "groupTypeRoleId": 6},
+    {"personId": 2, "groupId": 11, "groupTypeRoleId": 7},
+    {"personId": 3, "groupId": 12, "groupTypeRoleId": 7},
+]
+
+
+def serve(ct_server):
+    ct_server.paged("/persons", PERSONS)
+    ct_server.paged("/groups", GROUPS)
+    ct_server.paged("/groups/members", MEMBERS)
+
+
+def check(snapshot):
+    # no personal data is kept
+    assert snapshot.persons_by_id[2] == {"id": 2, "statusId": 2}
+    assert snapshot.groups_of_type(2)[0] == {
+        "id": 11,
+        "name": "Technik",
+        "information": {"groupTypeId": 2, "groupStatusId": 1},
+    }
+    assert snapshot.persons_with_status([1]) == {1, 3}
+    assert snapshot.persons_with_role([5, 7]) == {1, 2, 3}
+    # the archived group 12 only counts if asked for
+    assert snapshot.persons_with_role([5, 7], active_only=True) == {1, 2}
+    assert sorted(snapshot.memberships(1)) == [(10, 5), (11, 6)]
+    assert snapshot.memberships(3) == [(12, 7)]
+    assert snapshot.memberships(3, active_only=True) == []
+    assert snapshot.members(11) == {1, 2}
+    assert snapshot.members(11, role_ids=[7]) == {2}
+
+
+def test_snapshot_indexes(api, ct_server):
+    serve(ct_server)
+
+    check(ChurchToolsSnapshot.load(api))
+    # memberships of inactive groups count, too
+    params = [q for _, p, q in ct_server.requests if p == "/groups"]
+    assert params[0]["show_inactive_groups"] == ["True"]
+
+
+def test_snapshot_is_reused(api, ct_server, tmp_path):
+    serve(ct_server)
+    path = tmp_path / "snapshot.json"
+
+    ChurchToolsSnapshot.load_cached(api, path, max_age=60)
+    snapshot = ChurchToolsSnapshot.load_cached(api, path, max_age=60)
+
+    check(snapshot)
+    assert ct_server.count("GET", "/persons") == 2
+    ChurchToolsSnapshot.load_cached(api, path, max_age=0)
+    assert ct_server.count("GET", "/persons") == 4